@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+os.environ.setdefault('API_ASYNC_VIEWS', '1')
 
-application = get_asgi_application()
+# Set up like django.core.asgi.get_asgi_application, with the handler
+# reading streamed responses on the async views' thread pool.
+django.setup(set_prefix=False)
+
+from core.async_views import ASGIHandler  # noqa: E402
+
+application = ASGIHandler()
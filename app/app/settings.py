@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -39,6 +41,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "core",
     "rest_framework",
     "rest_framework.authtoken",
@@ -48,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -83,14 +87,47 @@ WSGI_APPLICATION = "app.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.backends.postgresql",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASSWORD"),
+        # Required behind an external pooler in transaction mode.
+        "DISABLE_SERVER_SIDE_CURSORS": bool(
+            int(os.environ.get("DB_DISABLE_SERVER_SIDE_CURSORS", 0))
+        ),
+        # Connections are pooled per process, DB_POOL_MAX_SIZE=0 opens one
+        # per request. Pools of all workers together should stay below the
+        # server's max_connections.
+        "POOL": {
+            "MIN_SIZE": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+            "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 20)),
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            "IDLE_TIMEOUT": float(os.environ.get("DB_POOL_IDLE_TIMEOUT", 300)),
+            "PRE_PING": bool(int(os.environ.get("DB_POOL_PRE_PING", 1))),
+        },
     }
 }
 
+# Read replicas of the default database, one per host of DB_REPLICA_HOSTS.
+# Tests read them from the default database.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(",")), 1
+):
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{number}")
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+
+# Seconds a user's reads stay on the primary after they wrote, longer than
+# the replication lag so they never read stale data.
+DB_REPLICA_STICKY_SECONDS = int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -133,6 +170,35 @@ MEDIA_URL = "/static/media/"
 
 MEDIA_ROOT = "/vol/web/media"
 STATIC_ROOT = "/vol/web/static"
+
+# Resized copies generated for every recipe image, fitted in (width, height).
+IMAGE_VARIANTS = {
+    "thumbnail": (150, 150),
+    "card": (600, 400),
+    "full": (1600, 1600),
+}
+# Processes generating the image variants, 0 generates them in the request.
+IMAGE_VARIANT_WORKERS = int(os.environ.get("IMAGE_VARIANT_WORKERS", 2))
+# Largest image upload in bytes, checked while the upload is streamed.
+IMAGE_UPLOAD_MAX_BYTES = int(
+    os.environ.get("IMAGE_UPLOAD_MAX_BYTES", 20 * 1024 * 1024)
+)
+# Accepted image formats and largest image, read from the image header.
+IMAGE_FORMATS = ["JPEG", "PNG", "GIF", "WEBP"]
+IMAGE_MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", 50_000_000))
+# Directory of the unfinished chunked uploads, not served to clients, and
+# seconds after which an unfinished upload is deleted.
+IMAGE_UPLOAD_DIR = os.environ.get("IMAGE_UPLOAD_DIR", "/vol/web/uploads")
+IMAGE_UPLOAD_EXPIRY = int(os.environ.get("IMAGE_UPLOAD_EXPIRY", 24 * 3600))
+# Stored images used within this many seconds are never garbage collected,
+# they may belong to an upload that is not committed yet.
+IMAGE_GC_GRACE = int(os.environ.get("IMAGE_GC_GRACE", 3600))
+# Stored images are fanned out in IMAGE_SHARD_LEVELS directories named
+# after the next IMAGE_SHARD_WIDTH characters of their hash, run the
+# shard_images command after changing them.
+IMAGE_SHARD_LEVELS = int(os.environ.get("IMAGE_SHARD_LEVELS", 2))
+IMAGE_SHARD_WIDTH = int(os.environ.get("IMAGE_SHARD_WIDTH", 2))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -142,8 +208,82 @@ AUTH_USER_MODEL = "core.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # Selected with the Accept header or ?format=json / ?format=msgpack.
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "core.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
+# Cache for per-user API list responses, any Django cache backend works.
+# The default in-process cache evicts least recently used entries. Entries
+# are keyed by the user's data version stored in the database, so a write
+# in any process invalidates the responses cached by every process.
+API_CACHE_ALIAS = "api"
+API_CACHE_BACKEND = os.environ.get(
+    "API_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    API_CACHE_ALIAS: {
+        "BACKEND": API_CACHE_BACKEND,
+        "LOCATION": os.environ.get("API_CACHE_LOCATION", "api"),
+        "TIMEOUT": int(os.environ.get("API_CACHE_TIMEOUT", 300)),
+    },
+}
+if API_CACHE_BACKEND.endswith("LocMemCache"):
+    CACHES[API_CACHE_ALIAS]["OPTIONS"] = {
+        "MAX_ENTRIES": int(os.environ.get("API_CACHE_MAX_ENTRIES", 10000)),
+    }
+# Writers are pinned to the primary in the API cache, every worker must
+# see the pins.
+if DATABASE_REPLICAS and API_CACHE_BACKEND.endswith(
+    ("LocMemCache", "DummyCache")
+):
+    raise ImproperlyConfigured(
+        "DB_REPLICA_HOSTS requires an API_CACHE_BACKEND shared by all "
+        "workers, like Redis or Memcached."
+    )
+
+# Lifetime in seconds of the signed auth tokens, and how often each worker
+# reloads the list of revoked signed tokens from the database.
+AUTH_SIGNED_TOKEN_MAX_AGE = int(
+    os.environ.get("AUTH_SIGNED_TOKEN_MAX_AGE", 3600)
+)
+AUTH_DENYLIST_SYNC_INTERVAL = int(
+    os.environ.get("AUTH_DENYLIST_SYNC_INTERVAL", 5)
+)
+
+# Default and maximum ?page_size= for the paginated recipe APIs.
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 50))
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 500))
+
+# Default and maximum ?limit= of the tag and ingredient autocomplete.
+API_AUTOCOMPLETE_LIMIT = int(os.environ.get("API_AUTOCOMPLETE_LIMIT", 10))
+API_AUTOCOMPLETE_MAX_LIMIT = int(
+    os.environ.get("API_AUTOCOMPLETE_MAX_LIMIT", 50)
+)
+
+# Serve the recipe APIs with async views, set by app/asgi.py so WSGI
+# servers keep the synchronous views.
+API_ASYNC_VIEWS = bool(int(os.environ.get("API_ASYNC_VIEWS", 0)))
+# Threads running the views of async requests, each with its own database
+# connection.
+API_ASYNC_WORKERS = int(os.environ.get("API_ASYNC_WORKERS", 16))
+
+# Bearer token scrapers of /metrics must send, open to all when empty.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Maximum number of recipes accepted by one bulk create request.
+API_MAX_BULK_CREATE = int(os.environ.get("API_MAX_BULK_CREATE", 1000))
+
+# Number of recipes read from the database per chunk when exporting.
+API_EXPORT_CHUNK_SIZE = int(os.environ.get("API_EXPORT_CHUNK_SIZE", 500))
+
 
 SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
@@ -4,7 +4,9 @@ Django admin customizaiton.
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from core import models
+from django.db import transaction
+from django.utils import timezone
+from core import cache, images, models, search
 from django.utils.translation import gettext_lazy as _
 
 
@@ -41,7 +43,64 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class RecipeAdmin(admin.ModelAdmin):
+    """Define the admin pages for recipes."""
+
+    def save_related(self, request, form, formsets, change):
+        """Reindex the recipe once its tags and ingredients are saved."""
+        super().save_related(request, form, formsets, change)
+        search.update_search_vectors([form.instance.pk])
+        cache.bump_version(form.instance.user_id)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, type(obj).objects.filter(pk=obj.pk))
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        """Delete the recipes, their unused images and cached responses."""
+        recipes = list(queryset)
+        stored_images = [
+            name for recipe in recipes for name in images.recipe_images(recipe)
+        ]
+        super().delete_queryset(request, queryset)
+        images.release_on_commit(stored_images)
+        for user_id in {recipe.user_id for recipe in recipes}:
+            cache.bump_version(user_id)
+
+
+class RecipeAttrAdmin(admin.ModelAdmin):
+    """Define the admin pages for tags and ingredients."""
+
+    def save_model(self, request, obj, form, change):
+        """Save the item and reindex the recipes that use it."""
+        super().save_model(request, obj, form, change)
+        if change:
+            obj.recipe_set.update(updated_at=timezone.now())
+            search.update_search_vectors(obj.recipe_set.values("id"))
+        cache.bump_version(obj.user_id)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, type(obj).objects.filter(pk=obj.pk))
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        """Delete the items and reindex the recipes that used them."""
+        recipe_ids = {
+            pk
+            for pk in queryset.values_list("recipe", flat=True)
+            if pk is not None
+        }
+        user_ids = set(queryset.values_list("user_id", flat=True))
+        super().delete_queryset(request, queryset)
+        models.Recipe.objects.filter(pk__in=recipe_ids).update(
+            updated_at=timezone.now()
+        )
+        search.update_search_vectors(recipe_ids)
+        for user_id in user_ids:
+            cache.bump_version(user_id)
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Recipe)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
+admin.site.register(models.Recipe, RecipeAdmin)
+admin.site.register(models.Tag, RecipeAttrAdmin)
+admin.site.register(models.Ingredient, RecipeAttrAdmin)
@@ -0,0 +1,135 @@
+"""
+Async views serving the synchronous API views on ASGI.
+
+DRF views are synchronous, served as they are on ASGI Django runs all of
+them on its one thread for synchronous code. These wrappers run the view
+and the rendering of its response on a bounded thread pool instead, so
+requests waiting on the database do not queue behind each other while
+the event loop keeps serving slow clients.
+
+``ASGIHandler`` reads streamed responses on the same pool, one part at a
+time, as Django would iterate them on the event loop thread where the
+database cannot be used.
+"""
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler as BaseASGIHandler
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+_executor = None
+_executor_lock = threading.Lock()
+_done = object()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.API_ASYNC_WORKERS,
+                thread_name_prefix="api-async",
+            )
+    return _executor
+
+
+def _call_view(view, request, *args, **kwargs):
+    """Run a view and render its response on a pool thread."""
+    # Every pool thread keeps its own database connection, the handler
+    # only checks the connections of its own thread at the start and end
+    # of requests.
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, "render", None)):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def as_async_view(view):
+    """Return an async view running ``view`` on the thread pool."""
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        call_view = sync_to_async(
+            _call_view, thread_sensitive=False, executor=_get_executor()
+        )
+        return await call_view(view, request, *args, **kwargs)
+
+    return async_view
+
+
+def as_async_urlpatterns(urlpatterns):
+    """Return the url patterns with their views made async."""
+    return [
+        URLPattern(
+            pattern.pattern,
+            as_async_view(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        for pattern in urlpatterns
+    ]
+
+
+def _next_part(iterator):
+    """Read the next part of a streamed response on a pool thread."""
+    close_old_connections()
+    try:
+        return next(iterator, _done)
+    finally:
+        close_old_connections()
+
+
+class ASGIHandler(BaseASGIHandler):
+    """ASGI handler reading streamed responses on the thread pool.
+
+    Consecutive parts may be read by different threads, the content of a
+    streamed response must not keep a database cursor open across parts.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode("ascii")
+            if isinstance(value, str):
+                value = value.encode("latin1")
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            headers.append(
+                (b"Set-Cookie", cookie.output(header="").encode().strip())
+            )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": headers,
+            }
+        )
+        next_part = sync_to_async(
+            _next_part, thread_sensitive=False, executor=_get_executor()
+        )
+        iterator = iter(response)
+        while True:
+            part = await next_part(iterator)
+            if part is _done:
+                break
+            for chunk, _ in self.chunk_bytes(part):
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": True,
+                    }
+                )
+        await send({"type": "http.response.body"})
+        await sync_to_async(response.close, thread_sensitive=True)()
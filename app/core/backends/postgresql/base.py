@@ -0,0 +1,57 @@
+"""
+PostgreSQL database backend taking its connections from a pool.
+
+Set ``POOL`` in a database's settings to a dict with ``MAX_SIZE`` and
+optionally ``MIN_SIZE``, ``TIMEOUT``, ``IDLE_TIMEOUT`` and ``PRE_PING``.
+Closing a connection, like Django does at the end of each request with
+``CONN_MAX_AGE`` at 0, returns it to the pool of the process.
+"""
+import functools
+
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from django.utils.asyncio import async_unsafe
+
+from core.backends.postgresql import pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # The test database can only be dropped once no connection is open.
+        pool.close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict.get("POOL") or {}
+        if not options.get("MAX_SIZE") or self.alias == NO_DB_ALIAS:
+            self.pool = None
+            return super().get_new_connection(conn_params)
+
+        self.pool = pool.get_pool(self.alias, conn_params, options)
+        connection = self.pool.checkout(
+            functools.partial(super().get_new_connection, conn_params)
+        )
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # The block keeps the connection until it exits, it cannot
+                # be handed out again.
+                self.pool.discard(self.connection)
+            else:
+                self.pool.release(self.connection)
@@ -0,0 +1,248 @@
+"""
+Pools of PostgreSQL connections shared by the threads of a process.
+"""
+import collections
+import os
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection was released in time."""
+
+
+class ConnectionPool:
+    """A bounded pool of database connections.
+
+    Idle connections are handed out most recently used first, those idle
+    longer than ``idle_timeout`` are closed down to ``min_size``. Once
+    ``max_size`` connections are open, checkouts wait for a release.
+    """
+
+    def __init__(
+        self,
+        alias,
+        min_size=0,
+        max_size=10,
+        timeout=10.0,
+        idle_timeout=300.0,
+        pre_ping=True,
+    ):
+        self.alias = alias
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.pre_ping = pre_ping
+        self._idle = collections.deque()
+        self._size = 0
+        self._condition = threading.Condition()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.discarded = 0
+
+    def checkout(self, connect):
+        """Return a connection, opened with ``connect`` if none is idle."""
+        while True:
+            connection = self._acquire()
+            if connection is None:
+                try:
+                    return connect()
+                except BaseException:
+                    self._forget()
+                    raise
+            if not self.pre_ping or self._ping(connection):
+                return connection
+            self.discard(connection)
+
+    def release(self, connection):
+        """Return a connection to the pool, resetting its session."""
+        if not self._reset(connection):
+            self.discard(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def discard(self, connection):
+        """Close a checked out connection, freeing its place."""
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        self._forget(discarded=True)
+
+    def close(self):
+        """Close the idle connections."""
+        with self._condition:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for connection in idle:
+            connection.close()
+
+    def stats(self):
+        """Return the size and counters of the pool."""
+        with self._condition:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "timeouts": self.timeouts,
+                "discarded": self.discarded,
+            }
+
+    def _acquire(self):
+        """Take an idle connection, or None to open a new one."""
+        expired = []
+        try:
+            with self._condition:
+                self.checkouts += 1
+                started = None
+                try:
+                    while True:
+                        expired += self._expire()
+                        if self._idle:
+                            return self._idle.pop()[0]
+                        if self._size < self.max_size:
+                            self._size += 1
+                            return None
+                        if started is None:
+                            started = time.monotonic()
+                            self.waits += 1
+                        remaining = started + self.timeout - time.monotonic()
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise PoolTimeout(
+                                f"No connection to {self.alias!r} released "
+                                f"within {self.timeout} seconds."
+                            )
+                        self._condition.wait(remaining)
+                finally:
+                    if started is not None:
+                        self.wait_seconds += time.monotonic() - started
+        finally:
+            for connection in expired:
+                connection.close()
+
+    def _expire(self):
+        """Remove and return the connections idle for too long."""
+        expired = []
+        deadline = time.monotonic() - self.idle_timeout
+        while (
+            self._idle
+            and self._idle[0][1] < deadline
+            and self._size > self.min_size
+        ):
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+        return expired
+
+    def _forget(self, discarded=False):
+        with self._condition:
+            self._size -= 1
+            if discarded:
+                self.discarded += 1
+            self._condition.notify()
+
+    def _reset(self, connection):
+        """End any open transaction and reset the session state.
+
+        Settings, temporary tables, prepared statements and session locks
+        of a request never reach the next one. Returns whether the
+        connection can be reused.
+        """
+        if connection.closed:
+            return False
+        try:
+            if (
+                connection.get_transaction_status()
+                != extensions.TRANSACTION_STATUS_IDLE
+            ):
+                connection.rollback()
+            autocommit = connection.autocommit
+            # DISCARD cannot run in a transaction block.
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute("DISCARD ALL")
+            connection.autocommit = autocommit
+        except psycopg2.Error:
+            return False
+        return (
+            connection.get_transaction_status()
+            == extensions.TRANSACTION_STATUS_IDLE
+        )
+
+    def _ping(self, connection):
+        """Return whether a connection still answers."""
+        if connection.closed:
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+
+def get_pool(alias, conn_params, options):
+    """Return the pool of this process for connection parameters."""
+    pool_key = (
+        os.getpid(),
+        alias,
+        repr((sorted(conn_params.items()), sorted(options.items()))),
+    )
+    with _pools_lock:
+        pool = _pools.get(pool_key)
+        if pool is None:
+            pool = _pools[pool_key] = ConnectionPool(
+                alias,
+                min_size=options.get("MIN_SIZE", 0),
+                max_size=options["MAX_SIZE"],
+                timeout=options.get("TIMEOUT", 10.0),
+                idle_timeout=options.get("IDLE_TIMEOUT", 300.0),
+                pre_ping=options.get("PRE_PING", True),
+            )
+    return pool
+
+
+def _process_pools(alias=None):
+    # Pools inherited from a parent process hold its connections, which
+    # must be left alone.
+    pid = os.getpid()
+    with _pools_lock:
+        return [
+            pool
+            for (pool_pid, pool_alias, _), pool in _pools.items()
+            if pool_pid == pid and alias in (None, pool_alias)
+        ]
+
+
+def pool_stats():
+    """Return the summed stats of the pools of this process by alias."""
+    stats = {}
+    for pool in _process_pools():
+        totals = stats.setdefault(pool.alias, collections.Counter())
+        totals.update(pool.stats())
+    return {alias: dict(totals) for alias, totals in stats.items()}
+
+
+def close_pools(alias=None):
+    """Close the idle connections of the pools of this process."""
+    for pool in _process_pools(alias):
+        pool.close()
@@ -0,0 +1,128 @@
+"""
+Helpers shared by the benchmark management commands.
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from core import bulk
+from core.models import Recipe, Tag, Ingredient
+
+BENCH_EMAIL = "bench-{}@example.com"
+
+
+def add_seed_arguments(parser):
+    """Add the dataset size options to a benchmark command."""
+    parser.add_argument(
+        "--recipes",
+        type=int,
+        default=20000,
+        help="Recipes seeded per benchmark user.",
+    )
+    parser.add_argument(
+        "--other-users",
+        type=int,
+        default=9,
+        help="Additional users seeded with the same amount of data.",
+    )
+    parser.add_argument("--tags", type=int, default=500, help="Tags per user.")
+    parser.add_argument(
+        "--ingredients", type=int, default=2000, help="Ingredients per user."
+    )
+    parser.add_argument(
+        "--runs", type=int, default=50, help="Timed runs per query."
+    )
+    parser.add_argument(
+        "--cleanup",
+        action="store_true",
+        help="Delete the benchmark users when done.",
+    )
+
+
+def seed_users(stdout, options, batch_size=5000):
+    """Create the benchmark users and their data, return the first user.
+
+    Users left over from a previous run are reused as they are.
+    """
+    rng = random.Random(0)
+    users = []
+    for i in range(options["other_users"] + 1):
+        user, created = get_user_model().objects.get_or_create(
+            email=BENCH_EMAIL.format(i)
+        )
+        users.append(user)
+        if not created:
+            continue
+
+        stdout.write(f"Seeding {user.email}")
+        with transaction.atomic():
+            tag_ids = list(
+                bulk.get_or_create_names(
+                    Tag, user, [f"tag {n}" for n in range(options["tags"])]
+                ).values()
+            )
+            ingredient_ids = list(
+                bulk.get_or_create_names(
+                    Ingredient,
+                    user,
+                    [f"ingredient {n}" for n in range(options["ingredients"])],
+                ).values()
+            )
+            for start in range(0, options["recipes"], batch_size):
+                count = min(batch_size, options["recipes"] - start)
+                recipes = Recipe.objects.bulk_create(
+                    [
+                        Recipe(
+                            user=user,
+                            title=f"Recipe {start + n}",
+                            time_minutes=rng.randint(5, 120),
+                            price=Decimal(rng.randint(100, 5000)) / 100,
+                        )
+                        for n in range(count)
+                    ]
+                )
+                bulk.add_recipe_links(
+                    Recipe.tags.through,
+                    Tag,
+                    {
+                        (recipe.id, tag_id)
+                        for recipe in recipes
+                        for tag_id in rng.sample(tag_ids, 3)
+                    },
+                )
+                bulk.add_recipe_links(
+                    Recipe.ingredients.through,
+                    Ingredient,
+                    {
+                        (recipe.id, ingredient_id)
+                        for recipe in recipes
+                        for ingredient_id in rng.sample(ingredient_ids, 8)
+                    },
+                )
+    return users[0]
+
+
+def delete_users(stdout):
+    """Delete every benchmark user with their data."""
+    users = get_user_model().objects.filter(
+        email__startswith="bench-", email__endswith="@example.com"
+    )
+    stdout.write(f"Deleting {users.count()} benchmark users")
+    users.delete()
+
+
+def time_call(func, runs):
+    """Return the median and 95th percentile latency of func in ms."""
+    func()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return statistics.median(timings), p95
@@ -0,0 +1,58 @@
+"""
+Set based writes for recipes and their tags and ingredients.
+"""
+
+from django.db import connection
+
+
+def get_or_create_names(model, user, names, ids=None):
+    """Return a name to id map of the user's objects, creating missing ones.
+
+    Names already present in ``ids`` are not looked up again, so callers
+    writing many batches can keep reusing one map.
+    """
+    ids = {} if ids is None else ids
+    unknown = set(names) - ids.keys()
+    if not unknown:
+        return ids
+
+    ids.update(
+        model.objects.filter(user=user, name__in=unknown).values_list(
+            "name", "id"
+        )
+    )
+    missing = unknown - ids.keys()
+    if missing:
+        # Rows created concurrently are skipped here and picked up by the
+        # following lookup, the unique (user, name) constraint keeps them
+        # from being duplicated.
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        ids.update(
+            model.objects.filter(user=user, name__in=missing).values_list(
+                "name", "id"
+            )
+        )
+    return ids
+
+
+def add_recipe_links(through, model, links):
+    """Insert ``(recipe_id, object_id)`` pairs into a recipe M2M table."""
+    if not links:
+        return
+
+    # Pass the links as two arrays rather than building a through model per
+    # row; for large batches compiling the ORM insert costs more than
+    # running it.
+    recipe_ids, object_ids = zip(*links)
+    quote_name = connection.ops.quote_name
+    column = through._meta.get_field(model._meta.model_name).column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote_name(through._meta.db_table)} "
+            f"(recipe_id, {quote_name(column)}) "
+            "SELECT * FROM unnest(%s::bigint[], %s::bigint[])",
+            [list(recipe_ids), list(object_ids)],
+        )
@@ -0,0 +1,71 @@
+"""
+Per-user versioned cache for API responses.
+
+Every cached response is keyed by the user's current data version, so
+bumping the version on a write makes all of the user's cached responses
+unreachable at once. Versions are stored on the user row, writes from any
+worker or command bump them in their own transaction and ``User.save``
+never writes them back. Responses are cached in the ``API_CACHE_ALIAS``
+entry of ``CACHES``.
+"""
+import hashlib
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import F
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def get_version(user_id):
+    """Return the user's data version."""
+    return (
+        get_user_model()
+        .objects.filter(pk=user_id)
+        .values_list("data_version", flat=True)
+        .first()
+    )
+
+
+def bump_version(user_id):
+    """Invalidate the user's cached responses.
+
+    The new version commits with the write, a read racing the write caches
+    the old data under the old version only.
+    """
+    get_user_model().objects.filter(pk=user_id).update(
+        data_version=F("data_version") + 1
+    )
+
+
+def response_key(user_id, uri):
+    """Return the cache key of a response for the user's current data."""
+    digest = hashlib.md5(uri.encode()).hexdigest()
+    return f"api-response:{user_id}:{get_version(user_id)}:{digest}"
+
+
+def get_response(key):
+    """Return the cached response data, or None, counting hits."""
+    data = _cache().get(key)
+    with _stats_lock:
+        _stats["hits" if data is not None else "misses"] += 1
+    return data
+
+
+def set_response(key, data):
+    """Cache response data."""
+    _cache().set(key, data)
+
+
+def get_stats():
+    """Return the hit and miss counts of this process."""
+    with _stats_lock:
+        return {"hits": _stats["hits"], "misses": _stats["misses"]}
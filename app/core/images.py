@@ -0,0 +1,302 @@
+"""
+Recipe image validation, variants and garbage collection.
+
+Variants are rendered in a process pool so image uploads return as soon
+as the original is stored, and are recorded on the recipe once written.
+Images are stored once per content, so a stored file is only deleted when
+no recipe refers to it any more.
+"""
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext as _
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from core import cache
+from core.models import Recipe
+from core.storage import RECIPE_IMAGE_DIR, image_storage, lock_stored_name
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMAT = "JPEG"
+VARIANT_EXTENSION = ".jpg"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def check_image_header(f):
+    """Return the format and size of an image file read from its header.
+
+    Pillow only decodes the pixels on first access, so this rejects
+    unsupported formats and decompression bombs without decoding them.
+    """
+    f.seek(0)
+    try:
+        image = Image.open(f, formats=settings.IMAGE_FORMATS)
+        image_format, (width, height) = image.format, image.size
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise ValidationError(
+            _("Upload a valid image in one of the formats: %(formats)s."),
+            code="invalid_image",
+            params={"formats": ", ".join(settings.IMAGE_FORMATS)},
+        )
+    finally:
+        f.seek(0)
+
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            _("Image has more than %(max)s pixels."),
+            code="image_too_large",
+            params={"max": settings.IMAGE_MAX_PIXELS},
+        )
+    return image_format, (width, height)
+
+
+def image_extension(image_format):
+    """Return the file extension of an image format."""
+    return ".jpg" if image_format == "JPEG" else f".{image_format.lower()}"
+
+
+def variant_name(variant):
+    """Return the name a variant is saved as, before content addressing."""
+    return os.path.join(RECIPE_IMAGE_DIR, f"{variant}{VARIANT_EXTENSION}")
+
+
+def render_variants(name):
+    """Write the resized variants of a stored image, return their names."""
+    sizes = settings.IMAGE_VARIANTS
+    with image_storage.open(name) as f, Image.open(f) as image:
+        # Let the JPEG decoder downscale while decoding, no variant needs
+        # more pixels than the largest size.
+        image.draft(
+            "RGB",
+            (
+                max(width for width, _ in sizes.values()),
+                max(height for _, height in sizes.values()),
+            ),
+        )
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+    names = {}
+    for variant, size in sizes.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, VARIANT_FORMAT, quality=85, optimize=True)
+        names[variant] = image_storage.save(
+            variant_name(variant), ContentFile(buffer.getvalue())
+        )
+    return names
+
+
+def render_variants_task(name):
+    """Render the variants in a pool worker, see ``render_variants``.
+
+    Saving locks the stored names in the database. Workers have no request
+    cycle closing their connections, a connection broken by a database
+    restart is replaced before the next task.
+    """
+    close_old_connections()
+    try:
+        return render_variants(name)
+    finally:
+        close_old_connections()
+
+
+def save_variants(recipe_id, user_id, name, names):
+    """Record the variants on the recipe unless its image was replaced."""
+    updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_variants=names, updated_at=timezone.now()
+    )
+    if updated:
+        cache.bump_version(user_id)
+    else:
+        release(names.values())
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                # Set up Django before core.images is imported to unpickle
+                # the first task.
+                initializer=django.setup,
+            )
+    return _executor
+
+
+def _submit(fn, *args):
+    """Submit a task, replacing the pool if a worker died."""
+    executor = _get_executor()
+    try:
+        return executor.submit(fn, *args)
+    except BrokenProcessPool:
+        global _executor
+        with _executor_lock:
+            if _executor is executor:
+                _executor = None
+        executor.shutdown(wait=False)
+        return _get_executor().submit(fn, *args)
+
+
+def _variants_done(recipe_id, user_id, name, future):
+    try:
+        save_variants(recipe_id, user_id, name, future.result())
+    except Exception:
+        logger.exception("Generating the variants of %s failed", name)
+    finally:
+        # Runs in the executor thread, which keeps no connection open.
+        connection.close()
+
+
+def generate_variants(recipe):
+    """Generate the variants of the recipe image in the background.
+
+    With IMAGE_VARIANT_WORKERS set to 0 they are generated right away.
+    Failures are logged, the image stays saved without variants.
+    """
+    name = recipe.image.name
+    if settings.IMAGE_VARIANT_WORKERS:
+        try:
+            future = _submit(render_variants_task, name)
+        except Exception:
+            logger.exception("Scheduling the variants of %s failed", name)
+            return
+        future.add_done_callback(
+            partial(_variants_done, recipe.id, recipe.user_id, name)
+        )
+        return
+
+    try:
+        names = render_variants(name)
+    except Exception:
+        logger.exception("Generating the variants of %s failed", name)
+        return
+    save_variants(recipe.id, recipe.user_id, name, names)
+
+
+def recipe_images(recipe):
+    """Return the stored names of the recipe image and its variants."""
+    if not recipe.image:
+        return []
+    return [recipe.image.name, *recipe.image_variants.values()]
+
+
+def _references(name):
+    """Return the recipes referring to a stored image."""
+    query = Q(image=name)
+    for variant in settings.IMAGE_VARIANTS:
+        query |= Q(image_variants__contains={variant: name})
+    return Recipe.objects.filter(query)
+
+
+def release(names):
+    """Delete the stored images no recipe refers to any more.
+
+    Files used within IMAGE_GC_GRACE seconds may belong to an upload not
+    committed yet, they are left to collect_garbage. Each file is checked
+    and deleted under its lock, so an upload reusing it meanwhile either
+    marks it used first or stores it again.
+    """
+    cutoff = time.time() - settings.IMAGE_GC_GRACE
+    for name in names:
+        with transaction.atomic():
+            lock_stored_name(name)
+            try:
+                if os.path.getmtime(image_storage.path(name)) > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            if not _references(name).exists():
+                image_storage.delete(name)
+
+
+def release_on_commit(names):
+    """Release stored images once the current transaction commits."""
+    names = list(names)
+    if names:
+        transaction.on_commit(lambda: release(names))
+
+
+def iter_stored_images():
+    """Yield the path and name of every stored recipe image file."""
+    root = image_storage.path(RECIPE_IMAGE_DIR)
+    pending = [root]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, image_storage.location)
+                    yield entry.path, name.replace(os.sep, "/")
+
+
+def collect_garbage(grace, dry_run=False):
+    """Delete stored images no recipe refers to, return their names.
+
+    Files modified in the last ``grace`` seconds are kept, they may belong
+    to uploads not committed yet.
+    """
+    cutoff = time.time() - grace
+    referenced = set()
+    recipes = Recipe.objects.exclude(image="").exclude(image=None)
+    for image, variants in recipes.values_list(
+        "image", "image_variants"
+    ).iterator():
+        referenced.add(image)
+        referenced.update(variants.values())
+
+    deleted = []
+    for path, name in iter_stored_images():
+        if name in referenced or os.path.getmtime(path) > cutoff:
+            continue
+        if not dry_run:
+            os.remove(path)
+        deleted.append(name)
+    return deleted
+
+
+@transaction.atomic
+def rename_references(old, new):
+    """Point the recipes using a stored image at another name."""
+    user_ids = set()
+    now = timezone.now()
+    for recipe in _references(old).only(
+        "id", "user_id", "image", "image_variants"
+    ):
+        if recipe.image.name == old:
+            recipe.image.name = new
+        for variant, name in recipe.image_variants.items():
+            if name == old:
+                recipe.image_variants[variant] = new
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image=recipe.image.name,
+            image_variants=recipe.image_variants,
+            updated_at=now,
+        )
+        user_ids.add(recipe.user_id)
+    for user_id in user_ids:
+        cache.bump_version(user_id)
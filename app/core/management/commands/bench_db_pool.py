@@ -0,0 +1,100 @@
+"""
+Django command for benchmarking the database connection pool.
+"""
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Django command to compare pooled and per request connections"""
+
+    help = (
+        "Have threads serve requests opening a connection, running a query "
+        "and closing the connection, like Django does with CONN_MAX_AGE at "
+        "0, once with a connection per request and once with the pool. "
+        "Prints the throughput, latency percentiles and pool stats."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=2000,
+            help="Requests served by all threads.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="Threads serving requests.",
+        )
+        parser.add_argument(
+            "--pool-size",
+            type=int,
+            default=4,
+            help="Maximum connections of the pool.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        self.options = options
+        for label, pool_size in (
+            ("per request", 0),
+            ("pooled", options["pool_size"]),
+        ):
+            self._measure(label, pool_size)
+
+    def _measure(self, label, pool_size):
+        """Serve the requests with a pool size and print the results."""
+        default = connections[DEFAULT_DB_ALIAS]
+        settings_dict = {
+            **default.settings_dict,
+            "POOL": {**(default.settings_dict.get("POOL") or {})},
+        }
+        settings_dict["POOL"]["MAX_SIZE"] = pool_size
+        threads = self.options["threads"]
+        per_thread = self.options["requests"] // threads
+        latencies = []
+        wrappers = []
+
+        def serve():
+            wrapper = type(default)(settings_dict, DEFAULT_DB_ALIAS)
+            wrappers.append(wrapper)
+            for _ in range(per_thread):
+                started = time.perf_counter()
+                with wrapper.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT id FROM {Recipe._meta.db_table} LIMIT 1"
+                    )
+                wrapper.close()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=serve) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{label:12} {len(latencies) / elapsed:8.1f} req/s  "
+            f"p50 {percentiles[49] * 1000:6.2f}ms  "
+            f"p99 {percentiles[98] * 1000:6.2f}ms"
+        )
+        pool = wrappers[0].pool
+        if pool is not None:
+            stats = pool.stats()
+            self.stdout.write(
+                f"{'':12} {stats['size']} connections  "
+                f"{stats['checkouts']} checkouts  {stats['waits']} waits  "
+                f"{stats['timeouts']} timeouts"
+            )
+            pool.close()
@@ -0,0 +1,126 @@
+"""
+Django command for benchmarking the query indexes.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core import benchmarks
+from core.models import Recipe, Tag, Ingredient
+
+INDEXES = [
+    "recipe_user_id_idx",
+    "recipe_tags_tag_recipe_idx",
+    "recipe_ingredients_ingredient_recipe_idx",
+    "tag_user_name_prefix_idx",
+]
+
+
+class Rollback(Exception):
+    """Raised to undo the index drop after measuring."""
+
+
+class Command(BaseCommand):
+    """Django command to compare query plans with and without indexes"""
+
+    help = (
+        "Seed a large dataset and print EXPLAIN plans and latencies of the "
+        "API queries without and with the indexes added for them."
+    )
+
+    def add_arguments(self, parser):
+        benchmarks.add_seed_arguments(parser)
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help="Print the full EXPLAIN ANALYZE output.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        self.options = options
+        user = benchmarks.seed_users(self.stdout, options)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        queries = self._queries(user)
+        # Dropping the indexes inside a transaction that is rolled back
+        # leaves the schema untouched, postgres DDL is transactional.
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for index in INDEXES:
+                        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+                self._measure("without indexes", queries)
+                raise Rollback()
+        except Rollback:
+            pass
+        self._measure("with indexes", queries)
+
+        if options["cleanup"]:
+            benchmarks.delete_users(self.stdout)
+
+    def _queries(self, user):
+        """Return the querysets issued by the API, by name."""
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list("id", flat=True)[:5]
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(user=user).values_list("id", flat=True)[
+                :5
+            ]
+        )
+        names = list(
+            Tag.objects.filter(user=user).values_list("name", flat=True)[:30]
+        )
+        return {
+            "recipe list": Recipe.objects.filter(user=user).order_by("-id")[
+                :50
+            ],
+            "recipes by tag": Recipe.objects.filter(
+                user=user, tags__id__in=tag_ids
+            ).order_by("-id")[:50],
+            "recipes by ingredient": Recipe.objects.filter(
+                user=user, ingredients__id__in=ingredient_ids
+            ).order_by("-id")[:50],
+            "tag list": Tag.objects.filter(user=user).order_by("-name")[:50],
+            "tag name lookup": Tag.objects.filter(user=user, name__in=names),
+            "tag autocomplete": Tag.objects.filter(
+                user=user, name__istartswith="tag 12"
+            )
+            .annotate(
+                recipe_count=Coalesce(
+                    Subquery(
+                        Recipe.tags.through.objects.filter(tag=OuterRef("pk"))
+                        .order_by()
+                        .values("tag")
+                        .annotate(count=Count("*"))
+                        .values("count")
+                    ),
+                    0,
+                )
+            )
+            .order_by("-recipe_count", "name")[:10],
+            "login lookup": type(user).objects.filter(email=user.email),
+        }
+
+    def _measure(self, label, queries):
+        """Print the plan and latency of every query."""
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== {label} =="))
+        for name, queryset in queries.items():
+            plan = queryset.explain(analyze=True)
+            median, p95 = benchmarks.time_call(
+                lambda: list(queryset.all()), self.options["runs"]
+            )
+            scans = [
+                line.strip(" ->").split("  (")[0]
+                for line in plan.splitlines()
+                if "Scan" in line
+            ]
+            self.stdout.write(
+                f"{name:<24} median {median:7.2f}ms  p95 {p95:7.2f}ms  "
+                + "; ".join(scans)
+            )
+            if self.options["explain"]:
+                self.stdout.write(plan)
@@ -0,0 +1,78 @@
+"""
+Django command for benchmarking the overhead of the request metrics.
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core import benchmarks
+from core.models import Recipe
+
+METRICS_MIDDLEWARE = "core.metrics.MetricsMiddleware"
+
+
+class Command(BaseCommand):
+    """Django command to time API requests with and without metrics"""
+
+    help = (
+        "Seed a large dataset and time API requests served in process "
+        "without and with the metrics middleware."
+    )
+
+    def add_arguments(self, parser):
+        benchmarks.add_seed_arguments(parser)
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        user = benchmarks.seed_users(self.stdout, options)
+        token = Token.objects.get_or_create(user=user)[0].key
+        recipe_id = Recipe.objects.filter(user=user).latest("id").id
+        paths = {
+            "recipe list": reverse("recipe:recipe-list") + "?page_size=20",
+            "recipe detail": reverse("recipe:recipe-detail", args=[recipe_id]),
+            "tag list": reverse("recipe:tag-list") + "?page_size=20",
+        }
+        middleware = {
+            "without": [
+                name
+                for name in settings.MIDDLEWARE
+                if name != METRICS_MIDDLEWARE
+            ],
+            "with": [METRICS_MIDDLEWARE, *settings.MIDDLEWARE],
+        }
+
+        clients = {}
+        for name, classes in middleware.items():
+            with override_settings(MIDDLEWARE=list(dict.fromkeys(classes))):
+                clients[name] = Client(
+                    HTTP_HOST=settings.ALLOWED_HOSTS[0],
+                    HTTP_AUTHORIZATION=f"Token {token}",
+                )
+                # The client loads the middleware on its first request.
+                clients[name].get(paths["tag list"])
+
+        for label, path in paths.items():
+            timings = {name: [] for name in clients}
+            # Alternating the clients spreads any drift over both.
+            for _ in range(options["runs"]):
+                for name, client in clients.items():
+                    started = time.perf_counter()
+                    client.get(path)
+                    timings[name].append(time.perf_counter() - started)
+            medians = {
+                name: statistics.median(values) * 1000
+                for name, values in timings.items()
+            }
+            self.stdout.write(
+                f"{label:<14} without {medians['without']:7.3f}ms  "
+                f"with {medians['with']:7.3f}ms  overhead "
+                f"{medians['with'] / medians['without'] - 1:6.1%}"
+            )
+
+        if options["cleanup"]:
+            benchmarks.delete_users(self.stdout)
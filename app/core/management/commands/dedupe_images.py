@@ -0,0 +1,70 @@
+"""
+Django command for deduplicating the stored recipe images.
+"""
+import os
+
+from django.core.management.base import BaseCommand
+
+from core import images
+from core.storage import (
+    RECIPE_IMAGE_DIR,
+    content_name,
+    file_digest,
+    image_storage,
+    read_chunks,
+)
+
+
+class Command(BaseCommand):
+    """Django command to move stored images to content addressed names"""
+
+    help = (
+        "Rename every stored recipe image after the hash of its content, "
+        "merging identical files and pointing the recipes at the kept "
+        "file. Files are hashed in chunks one at a time, so memory use "
+        "does not grow with the number or size of the files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would change.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        dry_run = options["dry_run"]
+        renamed = merged = freed = 0
+        for path, name in images.iter_stored_images():
+            with open(path, "rb") as f:
+                digest = file_digest(read_chunks(f))
+            extension = os.path.splitext(name)[1].lower()
+            target = content_name(RECIPE_IMAGE_DIR, digest, extension)
+            if target == name:
+                continue
+
+            if image_storage.exists(target):
+                merged += 1
+                freed += os.path.getsize(path)
+            else:
+                renamed += 1
+                if not dry_run:
+                    # Link first so the old and new names both resolve
+                    # until the recipes are updated.
+                    os.makedirs(
+                        os.path.dirname(image_storage.path(target)),
+                        exist_ok=True,
+                    )
+                    os.link(path, image_storage.path(target))
+            if not dry_run:
+                images.rename_references(name, target)
+                os.remove(path)
+
+        prefix = "Would merge" if dry_run else "Merged"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix} {merged} duplicates ({freed} bytes) and renamed "
+                f"{renamed} images"
+            )
+        )
@@ -0,0 +1,36 @@
+"""
+Django command for deleting unreferenced recipe images.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import images
+
+
+class Command(BaseCommand):
+    """Django command to garbage collect stored images"""
+
+    help = "Delete the stored recipe images and variants no recipe refers to."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=settings.IMAGE_GC_GRACE,
+            help="Keep files modified in the last GRACE seconds.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list the files that would be deleted.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        deleted = images.collect_garbage(options["grace"], options["dry_run"])
+        for name in deleted:
+            self.stdout.write(name)
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {len(deleted)} unreferenced images")
+        )
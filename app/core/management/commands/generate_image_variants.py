@@ -0,0 +1,65 @@
+"""
+Django command for generating missing recipe image variants.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+
+from core import images
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Django command to generate the variants of existing images"""
+
+    help = (
+        "Generate the resized variants of recipe images that have none, "
+        "or of every image with --all."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Regenerate the variants of every image.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Rendering processes, defaults to the number of CPUs.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        recipes = Recipe.objects.exclude(image="").exclude(image=None)
+        if not options["all"]:
+            recipes = recipes.filter(image_variants={})
+        recipes = list(recipes.values_list("id", "user_id", "image"))
+
+        done = 0
+        # Spawned, forked workers would share the database connections of
+        # this process.
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        ) as executor:
+            futures = {
+                executor.submit(images.render_variants_task, recipe[2]): recipe
+                for recipe in recipes
+            }
+            for future in as_completed(futures):
+                recipe_id, user_id, image = futures[future]
+                try:
+                    names = future.result()
+                except Exception as e:
+                    self.stderr.write(f"Skipping {image}: {e}")
+                    continue
+                images.save_variants(recipe_id, user_id, image, names)
+                done += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated the variants of {done} images")
+        )
@@ -0,0 +1,246 @@
+"""
+Django command for importing recipes in bulk.
+"""
+import csv
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import bulk, cache, search
+from core.models import ImportCheckpoint, Recipe, Tag, Ingredient
+
+CSV_LIST_SEPARATOR = ";"
+
+
+class Command(BaseCommand):
+    """Django command to import recipes from NDJSON or CSV"""
+
+    help = (
+        "Import recipes with their tags and ingredients for a user. NDJSON "
+        "lines use the recipe export format, CSV files have title, "
+        "time_minutes, price, description, link, tags and ingredients "
+        "columns with tags and ingredients separated by "
+        f"'{CSV_LIST_SEPARATOR}'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument(
+            "--user", required=True, help="Email of the recipes owner."
+        )
+        parser.add_argument(
+            "--format",
+            choices=["ndjson", "csv"],
+            help="File format, guessed from the extension by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Recipes written per insert.",
+        )
+        parser.add_argument(
+            "--checkpoint-every",
+            type=int,
+            default=10,
+            help="Batches committed together as one checkpoint.",
+        )
+        parser.add_argument(
+            "--checkpoint-name",
+            help="Name of the progress record, defaults to the full PATH.",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip the records committed by a previous run.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        path = options["path"]
+        file_format = options["format"] or self._guess_format(path)
+        checkpoint_name = options["checkpoint_name"] or os.path.abspath(path)
+
+        try:
+            self.user = get_user_model().objects.get(email=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+
+        self.tag_ids = dict(
+            Tag.objects.filter(user=self.user).values_list("name", "id")
+        )
+        self.ingredient_ids = dict(
+            Ingredient.objects.filter(user=self.user).values_list("name", "id")
+        )
+
+        self.skipped = 0
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            user=self.user, name=checkpoint_name
+        )
+        done = checkpoint.records if options["resume"] else 0
+        if done:
+            self.stdout.write(f"Resuming after {done} records")
+
+        with open(path, newline="") as f:
+            records = self._read_records(f, file_format)
+            records = islice(records, done, None)
+            started = time.monotonic()
+            imported = 0
+            finished = False
+            while not finished:
+                # Records read move the checkpoint, written ones are reported.
+                count = written = 0
+                with transaction.atomic():
+                    for _ in range(options["checkpoint_every"]):
+                        batch = list(islice(records, options["batch_size"]))
+                        if not batch:
+                            finished = True
+                            break
+                        valid = [record for record in batch if record]
+                        if valid:
+                            self._write_batch(valid)
+                        count += len(batch)
+                        written += len(valid)
+                    if count:
+                        # Committed with the batches, a failed run resumes
+                        # exactly after the last commit.
+                        checkpoint.records = done + count
+                        checkpoint.save(
+                            update_fields=["records", "updated_at"]
+                        )
+                if not count:
+                    break
+                done += count
+                imported += written
+                rate = imported / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f"Imported {imported} recipes ({rate:.0f} recipes/s)"
+                )
+
+        checkpoint.delete()
+        if self.skipped:
+            self.stdout.write(
+                self.style.WARNING(f"Skipped {self.skipped} invalid records")
+            )
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} recipes"))
+
+    def _guess_format(self, path):
+        """Return the file format from the file extension."""
+        ext = os.path.splitext(path)[1].lower()
+        if ext in (".ndjson", ".jsonl"):
+            return "ndjson"
+        if ext == ".csv":
+            return "csv"
+        raise CommandError(f"Cannot guess the format of {path}, use --format")
+
+    def _read_records(self, f, file_format):
+        """Yield ``(recipe, tag names, ingredient names)`` tuples."""
+        if file_format == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield self._parse(
+                    reader.line_num,
+                    row,
+                    self._split(row.get("tags")),
+                    self._split(row.get("ingredients")),
+                )
+        else:
+            for line_num, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    tags = [tag["name"] for tag in row.get("tags", [])]
+                    ingredients = [
+                        item["name"] for item in row.get("ingredients", [])
+                    ]
+                except (ValueError, TypeError, KeyError) as e:
+                    raise CommandError(f"Line {line_num}: invalid record {e}")
+                yield self._parse(line_num, row, tags, ingredients)
+
+    def _split(self, value):
+        """Split a CSV list column into names."""
+        if not value:
+            return []
+        names = value.split(CSV_LIST_SEPARATOR)
+        return [name.strip() for name in names if name.strip()]
+
+    def _parse(self, line_num, row, tags, ingredients):
+        """Build an unsaved recipe from a record, None if it is invalid.
+
+        Records that would not fit the columns are reported and skipped
+        rather than failing the insert of their whole batch.
+        """
+        try:
+            recipe = Recipe(
+                user=self.user,
+                title=row["title"],
+                time_minutes=int(row["time_minutes"]),
+                price=Decimal(str(row["price"])),
+                description=row.get("description") or "",
+                link=row.get("link") or "",
+            )
+        except (KeyError, ValueError, TypeError, InvalidOperation) as e:
+            raise CommandError(f"Line {line_num}: invalid record {e!r}")
+        try:
+            recipe.clean_fields(exclude=["user", "image"])
+            self._check_names(Tag, tags)
+            self._check_names(Ingredient, ingredients)
+        except ValidationError as e:
+            self.stderr.write(f"Line {line_num}: skipped {e.messages}")
+            self.skipped += 1
+            return None
+        return recipe, tags, ingredients
+
+    def _check_names(self, model, names):
+        """Raise ValidationError for names longer than the name column."""
+        max_length = model._meta.get_field("name").max_length
+        for name in names:
+            if len(name) > max_length:
+                raise ValidationError(
+                    f"{model._meta.verbose_name} name longer than "
+                    f"{max_length} characters"
+                )
+
+    def _write_batch(self, batch):
+        """Insert a batch of recipes with their tags and ingredients."""
+        recipes = Recipe.objects.bulk_create([record[0] for record in batch])
+        bulk.get_or_create_names(
+            Tag,
+            self.user,
+            {name for record in batch for name in record[1]},
+            self.tag_ids,
+        )
+        bulk.get_or_create_names(
+            Ingredient,
+            self.user,
+            {name for record in batch for name in record[2]},
+            self.ingredient_ids,
+        )
+        bulk.add_recipe_links(
+            Recipe.tags.through,
+            Tag,
+            {
+                (recipe.id, self.tag_ids[name])
+                for recipe, record in zip(recipes, batch)
+                for name in record[1]
+            },
+        )
+        bulk.add_recipe_links(
+            Recipe.ingredients.through,
+            Ingredient,
+            {
+                (recipe.id, self.ingredient_ids[name])
+                for recipe, record in zip(recipes, batch)
+                for name in record[2]
+            },
+        )
+        search.update_search_vectors([recipe.id for recipe in recipes])
+        cache.bump_version(self.user.id)
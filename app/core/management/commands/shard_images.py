@@ -0,0 +1,144 @@
+"""
+Django command for moving the stored recipe images to the fan-out layout.
+"""
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core import cache, images
+from core.models import Recipe
+from core.storage import (
+    DIGEST_RE,
+    RECIPE_IMAGE_DIR,
+    content_name,
+    file_digest,
+    image_storage,
+    read_chunks,
+)
+
+
+class Command(BaseCommand):
+    """Django command to move stored images to their sharded names"""
+
+    help = (
+        "Move the stored recipe images to the directories set by "
+        "IMAGE_SHARD_LEVELS and IMAGE_SHARD_WIDTH while the API keeps "
+        "serving. Each image is linked at its new name before the recipes "
+        "of a batch are pointed at it, the old files are deleted once no "
+        "recipe refers to them. Running it again resumes an interrupted "
+        "migration."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Recipes updated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        recipes = (
+            Recipe.objects.exclude(image="")
+            .exclude(image=None)
+            .order_by("pk")
+            .values_list("pk", "user_id", "image", "image_variants")
+        )
+        last_pk = 0
+        moved = skipped = 0
+        while True:
+            batch = list(
+                recipes.filter(pk__gt=last_pk)[: options["batch_size"]]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            batch_moved, batch_skipped = self._move_batch(batch)
+            moved += batch_moved
+            skipped += batch_skipped
+            self.stdout.write(f"Moved {moved} recipes up to id {last_pk}")
+
+        removed = self._remove_old_files()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Moved the images of {moved} recipes and removed {removed} "
+                f"old files, {skipped} recipes changed meanwhile"
+            )
+        )
+
+    def _move_batch(self, batch):
+        """Point a batch of recipes at the sharded names of their images.
+
+        A recipe is only updated if its images did not change since the
+        batch was read, concurrent uploads are already sharded.
+        """
+        updates = []
+        for pk, user_id, image, variants in batch:
+            new_image = self._link(image)
+            new_variants = {
+                variant: self._link(name) for variant, name in variants.items()
+            }
+            if new_image != image or new_variants != variants:
+                updates.append(
+                    (
+                        user_id,
+                        Recipe.objects.filter(
+                            pk=pk, image=image, image_variants=variants
+                        ),
+                        {"image": new_image, "image_variants": new_variants},
+                    )
+                )
+
+        moved = 0
+        user_ids = set()
+        now = timezone.now()
+        with transaction.atomic():
+            for user_id, recipe, values in updates:
+                if recipe.update(updated_at=now, **values):
+                    moved += 1
+                    user_ids.add(user_id)
+            for user_id in user_ids:
+                cache.bump_version(user_id)
+        return moved, len(updates) - moved
+
+    def _link(self, name):
+        """Link a stored image at its sharded name, return the name.
+
+        Files missing from the storage keep their name.
+        """
+        target = self._target(name)
+        if target is None or target == name:
+            return name
+        path = image_storage.path(target)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.link(image_storage.path(name), path)
+            except FileExistsError:
+                pass
+        return target
+
+    def _target(self, name):
+        """Return the sharded name of a stored image, None if missing."""
+        stem, extension = os.path.splitext(os.path.basename(name))
+        if DIGEST_RE.fullmatch(stem):
+            digest = stem
+        else:
+            try:
+                with image_storage.open(name) as f:
+                    digest = file_digest(read_chunks(f))
+            except FileNotFoundError:
+                return None
+        return content_name(RECIPE_IMAGE_DIR, digest, extension.lower())
+
+    def _remove_old_files(self):
+        """Delete the files left at old names no recipe refers to."""
+        old = []
+        for _, name in images.iter_stored_images():
+            if self._target(name) != name:
+                old.append(name)
+        images.release(old)
+        return sum(not image_storage.exists(name) for name in old)
@@ -0,0 +1,288 @@
+"""
+Per-request metrics of the API in the Prometheus text format.
+
+``MetricsMiddleware`` records the latency, SQL query count and time,
+response size and status of every request, labelled by view and action
+like ``RecipeViewSet.list``. Set ``PROMETHEUS_MULTIPROC_DIR`` to a shared
+empty directory when serving with several worker processes, each process
+then writes its samples there and ``/metrics`` sums them.
+
+The stats of the database connection pools of each process are copied to
+the ``db_pool_*`` metrics after requests, at most every
+``POOL_STATS_INTERVAL`` seconds, and on every scrape.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from core.backends.postgresql import pool
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# Other methods share one label, clients can send any method name.
+METHODS = frozenset(
+    ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+)
+POOL_STATS_INTERVAL = 1.0
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = tuple(256 * 4**n for n in range(8))
+
+REQUESTS = Counter(
+    "api_requests",
+    "Requests served.",
+    ["view", "method", "status"],
+)
+LATENCY = Histogram(
+    "api_request_duration_seconds",
+    "Time to serve a request.",
+    ["view"],
+    buckets=LATENCY_BUCKETS,
+)
+QUERIES = Histogram(
+    "api_request_queries",
+    "SQL queries run by a request.",
+    ["view"],
+    buckets=QUERY_BUCKETS,
+)
+QUERY_TIME = Histogram(
+    "api_request_query_duration_seconds",
+    "Time a request spent running SQL queries.",
+    ["view"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "api_response_size_bytes",
+    "Size of response bodies, streamed responses are not measured.",
+    ["view"],
+    buckets=SIZE_BUCKETS,
+)
+
+POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Open pooled database connections.",
+    ["alias", "state"],
+    multiprocess_mode="livesum",
+)
+POOL_COUNTERS = {
+    "checkouts": Counter(
+        "db_pool_checkouts", "Connections taken from the pool.", ["alias"]
+    ),
+    "waits": Counter(
+        "db_pool_waits", "Checkouts waiting for a release.", ["alias"]
+    ),
+    "wait_seconds": Counter(
+        "db_pool_wait_seconds",
+        "Time checkouts waited for a release.",
+        ["alias"],
+    ),
+    "timeouts": Counter(
+        "db_pool_timeouts", "Checkouts failed waiting.", ["alias"]
+    ),
+    "discarded": Counter(
+        "db_pool_discarded", "Broken connections closed.", ["alias"]
+    ),
+}
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+_pool_totals = {}
+_pool_totals_lock = threading.Lock()
+_pools_observed_at = None
+
+
+class RequestMetrics:
+    """The SQL queries run for a request so far."""
+
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.query_seconds += time.perf_counter() - started
+
+
+def _install_query_recorder(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _connection_created(sender, connection, **kwargs):
+    # Async views query from pool threads, the request's metrics reach
+    # their connections with the context.
+    _install_query_recorder(connection)
+
+
+connection_created.connect(_connection_created)
+
+
+@functools.lru_cache(maxsize=None)
+def _view_metrics(view):
+    # Looking up the labelled metrics takes a lock, views reuse theirs.
+    return (
+        LATENCY.labels(view),
+        QUERIES.labels(view),
+        QUERY_TIME.labels(view),
+        RESPONSE_SIZE.labels(view),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _requests(view, method, status):
+    return REQUESTS.labels(view, method, status)
+
+
+def observe_pools(force=True):
+    """Copy the stats of this process' connection pools to the metrics.
+
+    Unless forced, skipped within POOL_STATS_INTERVAL of the last copy.
+    """
+    global _pools_observed_at
+    now = time.monotonic()
+    if not force and (
+        _pools_observed_at is not None
+        and now - _pools_observed_at < POOL_STATS_INTERVAL
+    ):
+        return
+    _pools_observed_at = now
+    stats = pool.pool_stats()
+    with _pool_totals_lock:
+        for alias, values in stats.items():
+            POOL_CONNECTIONS.labels(alias, "idle").set(values["idle"])
+            POOL_CONNECTIONS.labels(alias, "in_use").set(values["in_use"])
+            last = _pool_totals.get(alias, {})
+            for name, counter in POOL_COUNTERS.items():
+                increase = values[name] - last.get(name, 0)
+                if increase > 0:
+                    counter.labels(alias).inc(increase)
+            _pool_totals[alias] = values
+
+
+def view_name(request):
+    """Return the metrics label of the view serving a request."""
+    match = request.resolver_match
+    if match is None:
+        return "unmatched"
+    func = match.func
+    view_class = getattr(func, "cls", None) or getattr(
+        func, "view_class", None
+    )
+    if view_class is None:
+        return f"{func.__module__}.{func.__qualname__}"
+    action = (getattr(func, "actions", None) or {}).get(request.method.lower())
+    if action is None:
+        return view_class.__name__
+    return f"{view_class.__name__}.{action}"
+
+
+class MetricsMiddleware:
+    """Record the metrics of every request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Mark the instance as a coroutine function like Django's
+            # MiddlewareMixin, so ASGI requests are not run in a thread.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        # Connections of this thread opened before the middleware loaded.
+        for connection in connections.all():
+            _install_query_recorder(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._observe(request, response, metrics, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._observe(request, response, metrics, started)
+        return response
+
+    def _observe(self, request, response, metrics, started):
+        view = view_name(request)
+        latency, queries, query_time, response_size = _view_metrics(view)
+        latency.observe(time.perf_counter() - started)
+        queries.observe(metrics.queries)
+        query_time.observe(metrics.query_seconds)
+        if not response.streaming:
+            response_size.observe(len(response.content))
+        method = request.method if request.method in METHODS else "other"
+        _requests(view, method, response.status_code).inc()
+        observe_pools(force=False)
+
+
+def metrics_view(request):
+    """Return the metrics of all worker processes."""
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponse(status=401)
+    observe_pools()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
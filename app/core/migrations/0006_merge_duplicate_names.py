@@ -0,0 +1,48 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:08
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge tags and ingredients sharing a user and name into one row."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field_name).through
+        fk = f'{model_name.lower()}_id'
+        duplicates = (
+            model.objects.values('user', 'name')
+            .annotate(keep_id=Min('id'), total=Count('id'))
+            .filter(total__gt=1)
+        )
+        for duplicate in duplicates:
+            keep_id = duplicate['keep_id']
+            other_ids = list(
+                model.objects.filter(user=duplicate['user'], name=duplicate['name'])
+                .exclude(id=keep_id)
+                .values_list('id', flat=True)
+            )
+            linked = set(
+                through.objects.filter(**{fk: keep_id})
+                .values_list('recipe_id', flat=True)
+            )
+            for row in through.objects.filter(**{f'{fk}__in': other_ids}):
+                if row.recipe_id in linked:
+                    row.delete()
+                else:
+                    setattr(row, fk, keep_id)
+                    row.save()
+                    linked.add(row.recipe_id)
+            model.objects.filter(id__in=other_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
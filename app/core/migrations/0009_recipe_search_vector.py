@@ -0,0 +1,60 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:25
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+# The search vector of core.search at the time of this migration.
+UPDATE_SEARCH_VECTORS = '''
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector('english', COALESCE(title, '')), 'A')
+    || setweight(to_tsvector('english', CONCAT_WS(' ',
+        (SELECT STRING_AGG(core_tag.name, ' ')
+         FROM core_tag
+         JOIN core_recipe_tags ON core_recipe_tags.tag_id = core_tag.id
+         WHERE core_recipe_tags.recipe_id = core_recipe.id),
+        (SELECT STRING_AGG(core_ingredient.name, ' ')
+         FROM core_ingredient
+         JOIN core_recipe_ingredients
+           ON core_recipe_ingredients.ingredient_id = core_ingredient.id
+         WHERE core_recipe_ingredients.recipe_id = core_recipe.id)
+    )), 'B')
+    || setweight(to_tsvector('english', COALESCE(description, '')), 'C')
+WHERE id > %s AND id <= %s
+'''
+
+
+def populate_search_vectors(apps, schema_editor):
+    """Compute the search vector of existing recipes in batches.
+
+    Each batch commits on its own so the rows are not all locked at once.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT MAX(id) FROM core_recipe')
+        max_id = cursor.fetchone()[0] or 0
+        for start in range(0, max_id, BATCH_SIZE):
+            cursor.execute(UPDATE_SEARCH_VECTORS, [start, start + BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS tag_user_name_prefix_idx '
+            'ON core_tag (user_id, UPPER(name) text_pattern_ops);',
+            'DROP INDEX CONCURRENTLY IF EXISTS tag_user_name_prefix_idx;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ingredient_user_name_prefix_idx '
+            'ON core_ingredient (user_id, UPPER(name) text_pattern_ops);',
+            'DROP INDEX CONCURRENTLY IF EXISTS ingredient_user_name_prefix_idx;',
+        ),
+    ]
@@ -6,6 +6,8 @@ import uuid
 import os
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -14,15 +16,20 @@ from django.contrib.auth.models import (
 )
 from typing import Optional
 
+from core.storage import RECIPE_IMAGE_DIR, image_storage
+
 # Create your models here.
 
 
 def recipe_image_file_path(instance, filename):
-    """Generate file path for new recipe image."""
+    """Generate file path for new recipe image.
+
+    The file name is replaced by the hash of the content when stored.
+    """
     ext = os.path.splitext(filename)[1]
     filename = f"{uuid.uuid4()}{ext}"
 
-    return os.path.join("uploads", "recipe", filename)
+    return os.path.join(RECIPE_IMAGE_DIR, filename)
 
 
 class UserManager(BaseUserManager):
@@ -58,11 +65,33 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Bumped by writes to the user's data, keys the cached API responses.
+    data_version = models.PositiveBigIntegerField(default=0, editable=False)
 
     objects: UserManager = UserManager()
 
     USERNAME_FIELD = "email"
 
+    def save(
+        self,
+        force_insert=False,
+        force_update=False,
+        using=None,
+        update_fields=None,
+    ):
+        """Save the user, leaving data_version to ``cache.bump_version``.
+
+        Full saves of a loaded user would write back the version it was
+        loaded with, undoing bumps committed since.
+        """
+        if update_fields is None and not (self._state.adding or force_insert):
+            update_fields = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != "data_version"
+            ]
+        super().save(force_insert, force_update, using, update_fields)
+
 
 class Recipe(models.Model):
     """Recipe object"""
@@ -78,12 +107,44 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField("Tag")
     ingredients = models.ManyToManyField("Ingredient")
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True, upload_to=recipe_image_file_path, storage=image_storage
+    )
+    image_variants = models.JSONField(default=dict, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-id"], name="recipe_user_id_idx"),
+            models.Index(
+                fields=["user", "updated_at"], name="recipe_user_updated_idx"
+            ),
+            GinIndex(fields=["search_vector"], name="recipe_search_idx"),
+            models.Index(fields=["image"], name="recipe_image_idx"),
+            GinIndex(
+                fields=["image_variants"],
+                name="recipe_image_variants_idx",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
 
+class ImageUpload(models.Model):
+    """Recipe image uploaded in chunks"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return str(self.id)
+
+
 class Tag(models.Model):
     """Tag for filtering recipes"""
 
@@ -92,6 +153,13 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="unique_tag_user_name"
+            ),
+        ]
+
     def __str__(self) -> str:
         return self.name
 
@@ -105,5 +173,55 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="unique_ingredient_user_name"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class RevokedToken(models.Model):
+    """Signed auth token revoked before its expiry"""
+
+    token_id = models.CharField(max_length=32, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return self.token_id
+
+
+class RevokedUser(models.Model):
+    """User whose signed auth tokens issued so far are revoked"""
+
+    # Not a foreign key, deleted users stay revoked.
+    user_id = models.BigIntegerField(unique=True)
+    revoked_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return str(self.user_id)
+
+
+class ImportCheckpoint(models.Model):
+    """Records of an import file committed so far"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    name = models.TextField()
+    records = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="unique_import_checkpoint"
+            ),
+        ]
+
     def __str__(self) -> str:
         return self.name
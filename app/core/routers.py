@@ -0,0 +1,109 @@
+"""
+Routing of API reads to the read replicas of the default database.
+
+Views using ``ReplicaReadsMixin`` run the queries of safe requests on a
+replica from ``DATABASE_REPLICAS``. A user's successful writes pin their
+reads to the primary for ``DB_REPLICA_STICKY_SECONDS`` so they always read
+them back. The pins are kept in the API cache, which settings require to
+be shared by all workers once replicas are configured. Everything else
+reads and writes the default database.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+
+_replica = contextvars.ContextVar("replica", default=None)
+
+
+def _cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def _pin_key(user_id):
+    return f"db-primary-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Read the user's data from the primary for the sticky window."""
+    _cache().set(
+        _pin_key(user_id), True, timeout=settings.DB_REPLICA_STICKY_SECONDS
+    )
+
+
+def is_pinned(user_id):
+    """Return whether the user wrote within the sticky window."""
+    return _cache().get(_pin_key(user_id), False)
+
+
+def replica_for(user_id):
+    """Return the replica to read the user's data from, None for primary."""
+    if not settings.DATABASE_REPLICAS or user_id is None:
+        return None
+    if is_pinned(user_id):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaRouter:
+    """Send the reads of replica requests to their replica."""
+
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        # Instances read from a replica are saved to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaReadsMixin:
+    """Serve safe requests from a replica, pin writers to the primary.
+
+    The replica is picked once the user is authenticated, the same one
+    serves all queries of the request.
+    """
+
+    # Actions only reading whatever their method.
+    read_actions = ()
+    writer_id = None
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _replica.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _replica.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            request.method in SAFE_METHODS
+            or getattr(self, "action", None) in self.read_actions
+        ):
+            _replica.set(replica_for(request.user.id))
+        else:
+            self.writer_id = request.user.id
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.writer_id is not None and status.is_success(
+            response.status_code
+        ):
+            # Pinned once the write committed, reads sent after the
+            # response see it. Failed writes changed nothing to read back.
+            pin_to_primary(self.writer_id)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,46 @@
+"""
+Full text search over recipes.
+"""
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db.models import OuterRef, Subquery
+
+from core.models import Recipe, Tag, Ingredient
+
+SEARCH_CONFIG = "english"
+
+
+def _linked_names(model):
+    """Return a subquery of the names linked to the outer recipe."""
+    return Subquery(
+        model.objects.filter(recipe=OuterRef("pk"))
+        .order_by()
+        .values("recipe")
+        .annotate(names=StringAgg("name", delimiter=" "))
+        .values("names")
+    )
+
+
+def search_vector(tag_model=Tag, ingredient_model=Ingredient):
+    """Return the expression computing a recipe's search vector.
+
+    Titles weigh most, then tag and ingredient names, then descriptions.
+    """
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(
+            _linked_names(tag_model),
+            _linked_names(ingredient_model),
+            weight="B",
+            config=SEARCH_CONFIG,
+        )
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """Recompute the search vector of the given recipes in one query."""
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        search_vector=search_vector()
+    )
@@ -0,0 +1,79 @@
+"""
+Content addressed storage for recipe images.
+"""
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.utils.deconstruct import deconstructible
+
+RECIPE_IMAGE_DIR = "uploads/recipe"
+HASH_CHUNK_SIZE = 1024 * 1024
+DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def file_digest(chunks):
+    """Return the SHA-256 hex digest of the chunks of a file."""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_chunks(f):
+    """Yield the content of an open file in HASH_CHUNK_SIZE chunks."""
+    return iter(lambda: f.read(HASH_CHUNK_SIZE), b"")
+
+
+def content_name(directory, digest, extension):
+    """Return the name of stored content in the fan-out layout.
+
+    Files go IMAGE_SHARD_LEVELS directories deep, each named after the
+    next IMAGE_SHARD_WIDTH characters of the digest, so no directory
+    holds more than a few thousand files.
+    """
+    width = settings.IMAGE_SHARD_WIDTH
+    shards = [
+        digest[start:][:width]
+        for start in range(0, settings.IMAGE_SHARD_LEVELS * width, width)
+    ]
+    return os.path.join(directory, *shards, f"{digest}{extension}")
+
+
+def lock_stored_name(name):
+    """Lock a stored name until the current transaction ends.
+
+    Serializes reusing a stored file with deleting it.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [name])
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files after the hash of their content.
+
+    Files are stored below the directory of the requested name with its
+    extension, saving content that is already stored returns the
+    existing file.
+    """
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        digest = file_digest(content.chunks(HASH_CHUNK_SIZE))
+        name = content_name(directory, digest, extension)
+        with transaction.atomic():
+            lock_stored_name(name)
+            if self.exists(name):
+                # Marks the file as recently used for the garbage
+                # collector, before release can delete it.
+                os.utime(self.path(name))
+                return name
+        return super()._save(name, content)
+
+
+image_storage = ContentAddressedStorage()
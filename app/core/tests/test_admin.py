@@ -6,6 +6,9 @@ from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from core import cache
+from core.models import Recipe, Tag
+
 
 class AdminSiteTests(TestCase):
     """Tests For Django admin"""
@@ -42,3 +45,53 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_edit_user_keeps_data_version(self):
+        """Test editing a user does not undo version bumps."""
+        cache.bump_version(self.user.id)
+        url = reverse("admin:core_user_change", args=[self.user.id])
+        payload = {
+            "email": self.user.email,
+            "is_active": "on",
+            "password": self.user.password,
+        }
+
+        res = self.client.post(url, payload)
+
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(cache.get_version(self.user.id), 1)
+
+    def test_edit_tag_invalidates_cache(self):
+        """Test renaming a tag reindexes its recipes and bumps the version."""
+        tag = Tag.objects.create(user=self.user, name="Hot")
+        recipe = Recipe.objects.create(
+            user=self.user, title="Pie", time_minutes=5, price="1.50"
+        )
+        recipe.tags.add(tag)
+        url = reverse("admin:core_tag_change", args=[tag.id])
+
+        res = self.client.post(url, {"user": self.user.id, "name": "Warm"})
+
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(cache.get_version(self.user.id), 1)
+        self.assertTrue(Recipe.objects.filter(search_vector="warm").exists())
+
+    def test_delete_recipes_invalidates_cache(self):
+        """Test deleting recipes bumps the version of their users."""
+        recipe = Recipe.objects.create(
+            user=self.user, title="Pie", time_minutes=5, price="1.50"
+        )
+        url = reverse("admin:core_recipe_changelist")
+
+        res = self.client.post(
+            url,
+            {
+                "action": "delete_selected",
+                "_selected_action": [recipe.id],
+                "post": "yes",
+            },
+        )
+
+        self.assertEqual(res.status_code, 302)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertEqual(cache.get_version(self.user.id), 1)
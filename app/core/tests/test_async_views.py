@@ -0,0 +1,133 @@
+"""
+Tests for the async views.
+"""
+import asyncio
+import json
+import threading
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler as BaseASGIHandler
+from django.core.exceptions import SynchronousOnlyOperation
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.async_views import (
+    ASGIHandler,
+    as_async_urlpatterns,
+    as_async_view,
+)
+from core.models import Recipe
+from recipe import urls, views
+
+
+class AsyncViewTests(TransactionTestCase):
+    """Test serving views from async views"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("user@example.com")
+        self.token = Token.objects.create(user=self.user)
+        Recipe.objects.create(
+            user=self.user, title="Pie", time_minutes=5, price="1.50"
+        )
+
+    def test_view_served_like_sync_view(self):
+        """Test the async view returns the rendered sync response"""
+        view = views.RecipeViewSet.as_view({"get": "list"})
+        url = reverse("recipe:recipe-list")
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, self.user)
+        expected = view(request).render()
+
+        response = async_to_sync(as_async_view(view))(
+            AsyncRequestFactory().get(
+                url, authorization=f"Token {self.token.key}"
+            )
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content)["results"],
+            json.loads(expected.content)["results"],
+        )
+
+    def test_view_runs_on_pool(self):
+        """Test views run on pool threads closing their connections"""
+        calls = []
+
+        def view(request):
+            connection = connections["default"]
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            calls.append((threading.current_thread().name, connection))
+            return HttpResponse("ok")
+
+        async_view = as_async_view(view)
+        self.assertTrue(asyncio.iscoroutinefunction(async_view))
+        response = async_to_sync(async_view)(AsyncRequestFactory().get("/"))
+
+        self.assertEqual(response.content, b"ok")
+        thread_name, thread_connection = calls[0]
+        self.assertTrue(thread_name.startswith("api-async"))
+        self.assertIsNone(thread_connection.connection)
+
+    def test_urlpatterns_made_async(self):
+        """Test url patterns keep their names and view attributes"""
+        patterns = as_async_urlpatterns(urls.router.urls)
+
+        self.assertEqual(
+            [pattern.name for pattern in patterns],
+            [pattern.name for pattern in urls.router.urls],
+        )
+        for pattern in patterns:
+            self.assertTrue(asyncio.iscoroutinefunction(pattern.callback))
+            self.assertTrue(pattern.callback.csrf_exempt)
+
+    def _asgi_get(self, application, path):
+        """Serve a GET request with an ASGI application, return messages."""
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": b"",
+            "headers": [
+                (b"host", b"testserver"),
+                (b"authorization", f"Token {self.token.key}".encode()),
+            ],
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(application)(scope, receive, send)
+        return messages
+
+    @override_settings(API_EXPORT_CHUNK_SIZE=1)
+    def test_streamed_response_read_on_pool(self):
+        """Test a streamed export reads the database off the event loop"""
+        Recipe.objects.create(
+            user=self.user, title="Soup", time_minutes=5, price="1.50"
+        )
+        url = reverse("recipe:recipe-export")
+        with self.assertRaises(SynchronousOnlyOperation):
+            self._asgi_get(BaseASGIHandler(), url)
+
+        messages = self._asgi_get(ASGIHandler(), url)
+
+        self.assertEqual(messages[0]["status"], 200)
+        body = b"".join(message.get("body", b"") for message in messages)
+        titles = [json.loads(line)["title"] for line in body.splitlines()]
+        self.assertEqual(titles, ["Soup", "Pie"])
+        self.assertFalse(messages[-1].get("more_body", False))
@@ -2,13 +2,31 @@
 Test Custom Djando Management Commands
 """
 
+from io import StringIO
 from unittest.mock import patch
+import json
+import os
+import tempfile
 from psycopg2 import OperationalError as psycopg2Error
 
 
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from PIL import Image
+
+from core import images
+from core.models import ImportCheckpoint, Recipe, Tag, Ingredient
+from core.management.commands.shard_images import (
+    Command as ShardImagesCommand,
+)
+from core.storage import file_digest
 
 
 @patch("core.management.commands.wait_for_db.Command.check")
@@ -31,3 +49,357 @@ class CommandTests(SimpleTestCase):
         call_command("wait_for_db")
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=["default"])
+
+
+class ImportRecipesCommandTests(TestCase):
+    """Test the import_recipes command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "password"
+        )
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def _write(self, filename, content):
+        """Write an import file and return its path."""
+        path = os.path.join(self.tmp_dir.name, filename)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def _ndjson(self, count):
+        """Return NDJSON for recipes sharing a tag."""
+        return "".join(
+            json.dumps(
+                {
+                    "title": f"Recipe {i}",
+                    "time_minutes": 10,
+                    "price": "5.50",
+                    "tags": [{"name": "Dinner"}],
+                    "ingredients": [{"name": f"Ingredient {i}"}],
+                }
+            )
+            + "\n"
+            for i in range(count)
+        )
+
+    def _import(self, path, *args):
+        """Run the import, return its output."""
+        out = StringIO()
+        call_command(
+            "import_recipes",
+            path,
+            "--user",
+            self.user.email,
+            *args,
+            stdout=out,
+            stderr=StringIO(),
+        )
+        return out.getvalue()
+
+    def test_import_ndjson(self):
+        """Test importing recipes from NDJSON in batches"""
+        Tag.objects.create(user=self.user, name="Dinner")
+        path = self._write("recipes.ndjson", self._ndjson(5))
+
+        self._import(path, "--batch-size", "2")
+
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 5)
+        for recipe in recipes:
+            self.assertEqual(recipe.tags.get().name, "Dinner")
+            self.assertEqual(recipe.ingredients.count(), 1)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_import_csv(self):
+        """Test importing recipes from CSV"""
+        path = self._write(
+            "recipes.csv",
+            "title,time_minutes,price,description,link,tags,ingredients\n"
+            "Curry,30,7.99,Spicy,,Thai;Dinner,Rice;Curry paste\n",
+        )
+
+        self._import(path)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, "Curry")
+        self.assertEqual(recipe.description, "Spicy")
+        self.assertEqual(
+            sorted(recipe.tags.values_list("name", flat=True)),
+            ["Dinner", "Thai"],
+        )
+        self.assertEqual(recipe.ingredients.count(), 2)
+
+    def test_import_resume_from_checkpoint(self):
+        """Test resuming skips the records already committed"""
+        path = self._write("recipes.ndjson", self._ndjson(5))
+        ImportCheckpoint.objects.create(user=self.user, name=path, records=3)
+
+        out = self._import(path, "--resume")
+
+        titles = Recipe.objects.values_list("title", flat=True)
+        self.assertEqual(sorted(titles), ["Recipe 3", "Recipe 4"])
+        self.assertIn("Imported 2 recipes\n", out)
+
+    def test_import_invalid_record_keeps_checkpoint(self):
+        """Test an invalid record stops the import after the last commit"""
+        content = self._ndjson(2) + json.dumps({"title": "Broken"}) + "\n"
+        path = self._write("recipes.ndjson", content)
+
+        with self.assertRaises(CommandError):
+            self._import(path, "--batch-size", "1", "--checkpoint-every", "2")
+
+        self.assertEqual(Recipe.objects.count(), 2)
+        checkpoint = ImportCheckpoint.objects.get(user=self.user, name=path)
+        self.assertEqual(checkpoint.records, 2)
+
+    def test_import_skips_records_too_long(self):
+        """Test records not fitting the columns are skipped"""
+        records = [
+            {"title": "x" * 256, "time_minutes": 5, "price": "1.00"},
+            {
+                "title": "Soup",
+                "time_minutes": 5,
+                "price": "1.00",
+                "tags": [{"name": "x" * 256}],
+            },
+            {"title": "Pie", "time_minutes": 5, "price": "1000.00"},
+            {"title": "Cake", "time_minutes": 5, "price": "1.00"},
+        ]
+        path = self._write(
+            "recipes.ndjson",
+            "".join(json.dumps(record) + "\n" for record in records),
+        )
+
+        out = self._import(path)
+
+        titles = Recipe.objects.values_list("title", flat=True)
+        self.assertEqual(list(titles), ["Cake"])
+        self.assertIn("Skipped 3 invalid records", out)
+        self.assertIn("Imported 1 recipes\n", out)
+        self.assertNotIn("Imported 4", out)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+
+class BenchIndexesCommandTests(TestCase):
+    """Test the bench_indexes command"""
+
+    def test_bench_indexes_keeps_indexes(self):
+        """Test benchmarking restores the indexes it drops"""
+        out = StringIO()
+        call_command(
+            "bench_indexes",
+            "--recipes=10",
+            "--other-users=0",
+            "--tags=5",
+            "--ingredients=10",
+            "--runs=1",
+            "--cleanup",
+            stdout=out,
+        )
+
+        self.assertIn("without indexes", out.getvalue())
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Recipe._meta.db_table
+            )
+        self.assertIn("recipe_user_id_idx", constraints)
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class GenerateImageVariantsCommandTests(TestCase):
+    """Test the generate_image_variants command"""
+
+    def test_generate_missing_variants(self):
+        """Test variants are generated for images that have none"""
+        user = get_user_model().objects.create_user("user@example.com")
+        recipe = Recipe.objects.create(
+            user=user, title="Pie", time_minutes=5, price="1.00"
+        )
+        with tempfile.SpooledTemporaryFile() as f:
+            Image.new("RGB", (800, 800)).save(f, format="JPEG")
+            f.seek(0)
+            recipe.image.save("pie.jpg", ContentFile(f.read()))
+
+        call_command("generate_image_variants", workers=1, stdout=StringIO())
+
+        recipe.refresh_from_db()
+        names = list(recipe.image_variants.values())
+        self.assertEqual(len(names), 3)
+        for name in names + [recipe.image.name]:
+            self.assertTrue(default_storage.exists(name))
+            default_storage.delete(name)
+
+
+class StoredImagesCommandTestCase(TestCase):
+    """Base for tests of commands managing the stored images"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.image_dir = os.path.join(media_root.name, "uploads", "recipe")
+        os.makedirs(self.image_dir)
+        self.user = get_user_model().objects.create_user("user@example.com")
+
+    def _store(self, filename, content):
+        """Write a file to the image directory, return its name."""
+        with open(os.path.join(self.image_dir, filename), "wb") as f:
+            f.write(content)
+        return f"uploads/recipe/{filename}"
+
+    def _stored_names(self):
+        """Return the names of the stored image files."""
+        return sorted(name for _, name in images.iter_stored_images())
+
+    def _create_recipe(self, **params):
+        return Recipe.objects.create(
+            user=self.user, title="Pie", time_minutes=5, price="1.00", **params
+        )
+
+
+class DedupeImagesCommandTests(StoredImagesCommandTestCase):
+    """Test the dedupe_images command"""
+
+    def test_duplicates_merged(self):
+        """Test identical files are merged and recipes repointed"""
+        first = self._create_recipe(
+            image=self._store("a.jpg", b"photo"),
+            image_variants={"thumbnail": self._store("a_thumb.jpg", b"small")},
+        )
+        second = self._create_recipe(image=self._store("b.JPG", b"photo"))
+        out = StringIO()
+
+        call_command("dedupe_images", stdout=out)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        digest = file_digest([b"photo"])
+        small_digest = file_digest([b"small"])
+        self.assertEqual(
+            first.image.name,
+            f"uploads/recipe/{digest[:2]}/{digest[2:4]}/{digest}.jpg",
+        )
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(
+            first.image_variants,
+            {
+                "thumbnail": f"uploads/recipe/{small_digest[:2]}/"
+                f"{small_digest[2:4]}/{small_digest}.jpg"
+            },
+        )
+        self.assertEqual(
+            self._stored_names(),
+            sorted([first.image.name, first.image_variants["thumbnail"]]),
+        )
+        self.assertIn("Merged 1 duplicates (5 bytes)", out.getvalue())
+
+    def test_dry_run_changes_nothing(self):
+        """Test a dry run leaves the files and recipes as they are"""
+        recipe = self._create_recipe(image=self._store("a.jpg", b"photo"))
+        self._store("b.jpg", b"photo")
+
+        call_command("dedupe_images", dry_run=True, stdout=StringIO())
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, "uploads/recipe/a.jpg")
+        self.assertEqual(
+            sorted(os.listdir(self.image_dir)), ["a.jpg", "b.jpg"]
+        )
+
+
+class GcImagesCommandTests(StoredImagesCommandTestCase):
+    """Test the gc_images command"""
+
+    def test_unreferenced_images_deleted(self):
+        """Test only files no recipe refers to are deleted"""
+        self._create_recipe(
+            image=self._store("used.jpg", b"a"),
+            image_variants={"card": self._store("card.jpg", b"b")},
+        )
+        self._store("orphan.jpg", b"c")
+
+        call_command("gc_images", grace=0, stdout=StringIO())
+
+        self.assertEqual(
+            sorted(os.listdir(self.image_dir)), ["card.jpg", "used.jpg"]
+        )
+
+    def test_recent_images_kept(self):
+        """Test files within the grace period are kept"""
+        self._store("orphan.jpg", b"c")
+
+        call_command("gc_images", grace=3600, stdout=StringIO())
+
+        self.assertEqual(os.listdir(self.image_dir), ["orphan.jpg"])
+
+
+@override_settings(IMAGE_GC_GRACE=0)
+class ShardImagesCommandTests(StoredImagesCommandTestCase):
+    """Test the shard_images command"""
+
+    def test_images_moved_to_shards(self):
+        """Test flat files are moved and recipes repointed in batches"""
+        digest = file_digest([b"photo"])
+        flat = self._store(f"{digest}.jpg", b"photo")
+        first = self._create_recipe(
+            image=flat,
+            image_variants={"card": self._store("card.JPG", b"card")},
+        )
+        second = self._create_recipe(image=flat)
+        self._store("orphan.jpg", b"orphan")
+        out = StringIO()
+
+        call_command("shard_images", batch_size=1, stdout=out)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        card_digest = file_digest([b"card"])
+        self.assertEqual(
+            first.image.name,
+            f"uploads/recipe/{digest[:2]}/{digest[2:4]}/{digest}.jpg",
+        )
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(
+            first.image_variants,
+            {
+                "card": f"uploads/recipe/{card_digest[:2]}/"
+                f"{card_digest[2:4]}/{card_digest}.jpg"
+            },
+        )
+        self.assertEqual(
+            self._stored_names(),
+            sorted([first.image.name, first.image_variants["card"]]),
+        )
+        self.assertIn("Moved the images of 2 recipes", out.getvalue())
+
+    @override_settings(IMAGE_SHARD_LEVELS=1, IMAGE_SHARD_WIDTH=3)
+    def test_layout_configurable(self):
+        """Test images are moved between shard layouts"""
+        recipe = self._create_recipe(image=self._store("a.jpg", b"photo"))
+        call_command("shard_images", stdout=StringIO())
+
+        recipe.refresh_from_db()
+        digest = file_digest([b"photo"])
+        self.assertEqual(
+            recipe.image.name, f"uploads/recipe/{digest[:3]}/{digest}.jpg"
+        )
+        self.assertEqual(self._stored_names(), [recipe.image.name])
+
+    def test_changed_recipe_skipped(self):
+        """Test a recipe whose image changed meanwhile is left alone"""
+        recipe = self._create_recipe(image=self._store("a.jpg", b"photo"))
+        command = ShardImagesCommand()
+        batch = [(recipe.pk, self.user.pk, recipe.image.name, {})]
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image=self._store("b.jpg", b"other")
+        )
+
+        self.assertEqual(command._move_batch(batch), (0, 1))
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, "uploads/recipe/b.jpg")
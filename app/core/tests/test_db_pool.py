@@ -0,0 +1,174 @@
+"""
+Tests for the pooled database backend.
+"""
+import threading
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import TestCase
+
+from core.backends.postgresql import pool
+
+
+class ConnectionPoolTests(TestCase):
+    """Test taking connections from the pool"""
+
+    def _wrapper(self, **options):
+        """Return a database wrapper using a pool with these options.
+
+        The application name keeps the connections apart from the pool of
+        the default connection.
+        """
+        settings_dict = {
+            **connection.settings_dict,
+            "OPTIONS": {"application_name": self._testMethodName},
+            "POOL": {"MAX_SIZE": 2, "PRE_PING": False, **options},
+        }
+        wrapper = type(connections["default"])(settings_dict, "default")
+        self.addCleanup(self._close, wrapper)
+        return wrapper
+
+    def _close(self, wrapper):
+        wrapper.close()
+        if wrapper.pool is not None:
+            wrapper.pool.close()
+
+    def test_connection_reused(self):
+        """Test closing returns the connection to the pool"""
+        wrapper = self._wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, raw)
+        stats = wrapper.pool.stats()
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["in_use"], 1)
+
+    def test_open_transaction_rolled_back(self):
+        """Test released connections have no open transaction"""
+        wrapper = self._wrapper()
+        wrapper.ensure_connection()
+        wrapper.connection.autocommit = False
+        with wrapper.connection.cursor() as cursor:
+            cursor.execute("CREATE TEMPORARY TABLE pool_test (id int)")
+        wrapper.close()
+        wrapper.ensure_connection()
+
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('pool_test')")
+            self.assertIsNone(cursor.fetchone()[0])
+
+    def test_session_state_reset(self):
+        """Test released connections forget their session state"""
+        wrapper = self._wrapper()
+        with wrapper.cursor() as cursor:
+            cursor.execute("SET statement_timeout = 1234")
+            cursor.execute("CREATE TEMPORARY TABLE pool_test (id int)")
+        raw = wrapper.connection
+        wrapper.close()
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, raw)
+        with wrapper.cursor() as cursor:
+            cursor.execute("SHOW statement_timeout")
+            self.assertEqual(cursor.fetchone()[0], "0")
+            cursor.execute("SELECT to_regclass('pool_test')")
+            self.assertIsNone(cursor.fetchone()[0])
+
+    def test_checkout_times_out(self):
+        """Test checkouts fail once the pool is full for too long"""
+        first = self._wrapper(MAX_SIZE=1, TIMEOUT=0.05)
+        second = self._wrapper(MAX_SIZE=1, TIMEOUT=0.05)
+        first.ensure_connection()
+
+        with self.assertRaises(OperationalError):
+            second.ensure_connection()
+
+        stats = second.pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreater(stats["wait_seconds"], 0)
+
+    def test_checkout_waits_for_release(self):
+        """Test a checkout gets the connection released meanwhile"""
+        first = self._wrapper(MAX_SIZE=1, TIMEOUT=5)
+        second = self._wrapper(MAX_SIZE=1, TIMEOUT=5)
+        first.ensure_connection()
+        raw = first.connection
+        first.inc_thread_sharing()
+        timer = threading.Timer(0.05, first.close)
+        timer.start()
+
+        second.ensure_connection()
+        timer.join()
+
+        self.assertIs(second.connection, raw)
+        stats = second.pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertEqual(stats["timeouts"], 0)
+
+    def test_broken_connection_replaced(self):
+        """Test pre-ping discards connections the server closed"""
+        wrapper = self._wrapper(PRE_PING=True)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_terminate_backend(%s)", [raw.get_backend_pid()]
+            )
+        wrapper.ensure_connection()
+
+        self.assertIsNot(wrapper.connection, raw)
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        stats = wrapper.pool.stats()
+        self.assertEqual(stats["discarded"], 1)
+        self.assertEqual(stats["size"], 1)
+
+    def test_idle_connections_expire(self):
+        """Test idle connections beyond the minimum size are closed"""
+        first = self._wrapper(MIN_SIZE=1, IDLE_TIMEOUT=0)
+        second = self._wrapper(MIN_SIZE=1, IDLE_TIMEOUT=0)
+        first.ensure_connection()
+        second.ensure_connection()
+        raws = [first.connection, second.connection]
+        first.close()
+        second.close()
+        first.ensure_connection()
+
+        self.assertEqual(sum(raw.closed for raw in raws), 1)
+        self.assertEqual(first.pool.stats()["size"], 1)
+
+    def test_pool_disabled(self):
+        """Test connections are closed without a pool size"""
+        wrapper = self._wrapper(MAX_SIZE=0)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+
+        self.assertTrue(raw.closed)
+        self.assertIsNone(wrapper.pool)
+
+    def test_pool_stats(self):
+        """Test the stats of the pools are summed by alias"""
+        wrapper = self._wrapper()
+        wrapper.ensure_connection()
+
+        stats = pool.pool_stats()["default"]
+
+        self.assertGreaterEqual(stats["in_use"], 2)
+        self.assertGreaterEqual(stats["checkouts"], 2)
+
+    def test_bench_db_pool(self):
+        """Test the benchmark compares per request and pooled connections"""
+        out = StringIO()
+        call_command("bench_db_pool", requests=20, threads=2, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("per request", output)
+        self.assertIn("20 checkouts", output)
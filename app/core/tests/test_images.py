@@ -0,0 +1,85 @@
+"""
+Tests for releasing stored recipe images.
+"""
+import io
+import tempfile
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import OperationalError, connection, transaction
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from core import images
+from core.models import Recipe
+from core.storage import image_storage, lock_stored_name
+
+
+@override_settings(IMAGE_GC_GRACE=0)
+class ImageReleaseTests(TransactionTestCase):
+    """Test deleting stored images no recipe refers to"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.user = get_user_model().objects.create_user("user@example.com")
+        self.name = image_storage.save(
+            "uploads/recipe/a.jpg", ContentFile(b"a")
+        )
+
+    def test_unreferenced_image_deleted(self):
+        """Test an image no recipe refers to is deleted"""
+        images.release([self.name])
+
+        self.assertFalse(image_storage.exists(self.name))
+
+    def test_image_referenced_meanwhile_kept(self):
+        """Test an image referenced while it is released is kept"""
+        locked = threading.Event()
+
+        def reuse():
+            # An upload of the same content, committed after the release
+            # started.
+            try:
+                with transaction.atomic():
+                    lock_stored_name(self.name)
+                    locked.set()
+                    Recipe.objects.create(
+                        user=self.user,
+                        title="Pie",
+                        time_minutes=5,
+                        price="1.50",
+                        image=self.name,
+                    )
+                    threading.Event().wait(0.1)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=reuse)
+        thread.start()
+        locked.wait()
+        images.release([self.name])
+        thread.join()
+
+        self.assertTrue(image_storage.exists(self.name))
+
+    def test_render_task_replaces_broken_connection(self):
+        """Test a render task runs after the database closed the connection"""
+        buffer = io.BytesIO()
+        Image.new("RGB", (20, 10)).save(buffer, "JPEG")
+        name = image_storage.save(
+            "uploads/recipe/b.jpg", ContentFile(buffer.getvalue())
+        )
+        # Like a database restart, the server ends the worker's connection.
+        with self.assertRaises(OperationalError):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_terminate_backend(pg_backend_pid())")
+
+        names = images.render_variants_task(name)
+
+        self.assertEqual(set(names), {"thumbnail", "card", "full"})
+        self.assertTrue(all(map(image_storage.exists, names.values())))
@@ -0,0 +1,237 @@
+"""
+Tests for the request metrics.
+"""
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Recipe
+
+RECIPE_URL = reverse("recipe:recipe-list")
+TOKEN_URL = reverse("user:token")
+METRICS_URL = reverse("metrics")
+
+
+def sample(name, **labels):
+    """Return the current value of a metric sample, 0 if missing."""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsMiddlewareTests(TestCase):
+    """Test recording the metrics of requests"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("user@example.com")
+        Recipe.objects.create(
+            user=self.user, title="Pie", time_minutes=5, price="1.50"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_request_recorded_by_view_and_action(self):
+        """Test a request's latency, queries, size and status are recorded"""
+        view = "RecipeViewSet.list"
+        requests = sample(
+            "api_requests_total", view=view, method="GET", status="200"
+        )
+        latencies = sample("api_request_duration_seconds_count", view=view)
+        queries = sample("api_request_queries_sum", view=view)
+        query_seconds = sample(
+            "api_request_query_duration_seconds_sum", view=view
+        )
+        size = sample("api_response_size_bytes_sum", view=view)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(
+            sample(
+                "api_requests_total", view=view, method="GET", status="200"
+            ),
+            requests + 1,
+        )
+        self.assertEqual(
+            sample("api_request_duration_seconds_count", view=view),
+            latencies + 1,
+        )
+        self.assertGreater(
+            sample("api_request_queries_sum", view=view), queries
+        )
+        self.assertGreater(
+            sample("api_request_query_duration_seconds_sum", view=view),
+            query_seconds,
+        )
+        self.assertEqual(
+            sample("api_response_size_bytes_sum", view=view),
+            size + len(res.content),
+        )
+
+    def test_api_view_and_status_labels(self):
+        """Test views without actions are labelled by their class"""
+        labels = {
+            "view": "CreateTokenView",
+            "method": "POST",
+            "status": "400",
+        }
+        before = sample("api_requests_total", **labels)
+
+        APIClient().post(TOKEN_URL, {"email": "x@example.com"})
+
+        self.assertEqual(sample("api_requests_total", **labels), before + 1)
+
+    def test_unmatched_requests(self):
+        """Test requests to unknown URLs share one label"""
+        labels = {"view": "unmatched", "method": "GET", "status": "404"}
+        before = sample("api_requests_total", **labels)
+
+        self.client.get("/unknown/path/")
+
+        self.assertEqual(sample("api_requests_total", **labels), before + 1)
+
+    def test_unknown_methods_share_label(self):
+        """Test arbitrary request methods are labelled as other"""
+        labels = {"view": "RecipeViewSet", "status": "405"}
+        before = sample("api_requests_total", method="other", **labels)
+
+        self.client.generic("FOO1", RECIPE_URL)
+        self.client.generic("FOO2", RECIPE_URL)
+
+        self.assertEqual(
+            sample("api_requests_total", method="other", **labels),
+            before + 2,
+        )
+        self.assertEqual(
+            sample("api_requests_total", method="FOO1", **labels), 0
+        )
+
+    def test_async_requests_count_queries_of_view_threads(self):
+        """Test queries of async views run in other threads are counted"""
+
+        def query():
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.execute("SELECT 2")
+            finally:
+                connection.close()
+
+        async def view(request):
+            await sync_to_async(query, thread_sensitive=False)()
+            return HttpResponse("ok")
+
+        middleware = metrics.MetricsMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        before = sample("api_request_queries_sum", view="unmatched")
+
+        async_to_sync(middleware)(AsyncRequestFactory().get("/"))
+
+        self.assertEqual(
+            sample("api_request_queries_sum", view="unmatched"), before + 2
+        )
+
+    def test_bench_metrics(self):
+        """Test the benchmark reports the overhead of each request"""
+        out = io.StringIO()
+        call_command(
+            "bench_metrics",
+            "--recipes=5",
+            "--other-users=0",
+            "--tags=5",
+            "--ingredients=10",
+            "--runs=2",
+            "--cleanup",
+            stdout=out,
+        )
+
+        self.assertEqual(out.getvalue().count("overhead"), 3)
+
+
+class MetricsEndpointTests(TestCase):
+    """Test exposing the metrics"""
+
+    def test_metrics_exposed(self):
+        """Test the metrics are served in the Prometheus text format"""
+        self.client.get(METRICS_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            b'api_requests_total{method="GET",status="200",'
+            b'view="core.metrics.metrics_view"}',
+            res.content,
+        )
+
+    def test_pool_stats_exposed(self):
+        """Test the stats of the connection pools are exposed"""
+        checkouts = sample("db_pool_checkouts_total", alias="default")
+        wrapper = type(connections["default"])(
+            {
+                **connection.settings_dict,
+                "OPTIONS": {"application_name": "metrics"},
+                "POOL": {"MAX_SIZE": 1, "PRE_PING": False},
+            },
+            "default",
+        )
+        wrapper.ensure_connection()
+        try:
+            res = self.client.get(METRICS_URL)
+        finally:
+            wrapper.close()
+            wrapper.pool.close()
+
+        self.assertIn(
+            b'db_pool_connections{alias="default",state="in_use"}',
+            res.content,
+        )
+        self.assertGreater(
+            sample("db_pool_checkouts_total", alias="default"), checkouts
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        """Test the metrics require the token once set"""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 401)
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(res.status_code, 200)
+
+    def test_worker_metrics_summed(self):
+        """Test the metrics of all worker processes are summed"""
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory}
+            script = (
+                "import django; django.setup(); from core import metrics; "
+                "metrics.REQUESTS.labels('Worker', 'GET', '200').inc()"
+            )
+            for _ in range(2):
+                subprocess.run(
+                    [sys.executable, "-c", script],
+                    cwd=settings.BASE_DIR,
+                    env={**env, "DJANGO_SETTINGS_MODULE": "app.settings"},
+                    check=True,
+                )
+
+            with patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory):
+                res = self.client.get(METRICS_URL)
+
+        self.assertIn(
+            b'api_requests_total{method="GET",status="200",view="Worker"} '
+            b"2.0",
+            res.content,
+        )
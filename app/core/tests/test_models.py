@@ -4,10 +4,11 @@ Tests For Models
 
 from unittest.mock import patch
 from decimal import Decimal
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
-from core import models
+from core import cache, models
 
 
 def create_user(email="user@example.com", password="user"):
@@ -59,6 +60,16 @@ class ModelTests(TestCase):
         self.assertTrue(user.is_superuser)
         self.assertTrue(user.is_staff)
 
+    def test_user_save_keeps_data_version(self):
+        """Test saving a loaded user does not undo version bumps"""
+        user = create_user()
+        cache.bump_version(user.id)
+
+        user.name = "New name"
+        user.save()
+
+        self.assertEqual(cache.get_version(user.id), 1)
+
     def test_create_recipe(self):
         """Test Creatingg a recipe is successfull"""
         user = get_user_model().objects.create_user(
@@ -81,6 +92,22 @@ class ModelTests(TestCase):
         tag = models.Tag.objects.create(user=user, name="Tag 1")
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name."""
+        user = create_user()
+        models.Tag.objects.create(user=user, name="Tag 1")
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name="Tag 1")
+
+    def test_ingredient_name_unique_per_user(self):
+        """Test a user cannot have two ingredients with the same name."""
+        user = create_user()
+        models.Ingredient.objects.create(user=user, name="Ingredient1")
+
+        with self.assertRaises(IntegrityError):
+            models.Ingredient.objects.create(user=user, name="Ingredient1")
+
     def test_create_ingredient(self):
         """Test creating an ingredient is successful."""
         user = create_user()
@@ -0,0 +1,90 @@
+"""
+Tests for the API renderers.
+"""
+import datetime
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+
+import msgpack
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+
+SAMPLE = ReturnDict(
+    [
+        ("id", 1),
+        ("title", "Crème brûlée   \U0001f36e"),
+        ("price", Decimal("10.50")),
+        ("ratio", 0.1),
+        ("large", 2**62),
+        ("tags", [OrderedDict([("id", 2), ("name", "Dessert")])]),
+        ("created", datetime.datetime(2024, 1, 2, 3, 4, 5, 6, timezone.utc)),
+        ("day", datetime.date(2024, 1, 2)),
+        ("uuid", uuid.UUID("12345678-1234-5678-1234-567812345678")),
+        ("message", gettext_lazy("Not found.")),
+        ("counts", {1: "one", "2": None, 3.5: False}),
+    ],
+    serializer=None,
+)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the orjson renderer"""
+
+    def test_renders_like_json_renderer(self):
+        """Test the output is byte for byte the one of JSONRenderer"""
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE)
+        )
+
+    def test_indented_like_json_renderer(self):
+        """Test indented output is left to JSONRenderer"""
+        media_type = "application/json; indent=2"
+
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE, media_type),
+            JSONRenderer().render(SAMPLE, media_type),
+        )
+
+    def test_unsupported_values_like_json_renderer(self):
+        """Test values orjson rejects fall back to JSONRenderer"""
+        data = {"huge": 2**70, "items": {1, 2}}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_none_renders_empty(self):
+        """Test no data renders an empty body"""
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+
+class MessagePackRendererTests(SimpleTestCase):
+    """Test the MessagePack renderer"""
+
+    def test_renders_json_values(self):
+        """Test the payload decodes to the values JSON clients get"""
+        payload = MessagePackRenderer().render(SAMPLE)
+
+        self.assertEqual(
+            msgpack.unpackb(payload, strict_map_key=False),
+            {
+                **{
+                    key: value
+                    for key, value in SAMPLE.items()
+                    if key not in ("price", "tags", "day", "uuid", "message")
+                },
+                "price": 10.5,
+                "tags": [{"id": 2, "name": "Dessert"}],
+                "created": "2024-01-02T03:04:05.000006Z",
+                "day": "2024-01-02",
+                "uuid": "12345678-1234-5678-1234-567812345678",
+                "message": "Not found.",
+            },
+        )
+        self.assertLess(len(payload), len(JSONRenderer().render(SAMPLE)))
@@ -0,0 +1,138 @@
+"""
+Tests for routing reads to replicas.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import routers
+from core.backends.postgresql import pool
+from core.models import Recipe
+
+REPLICA = "replica_test"
+RECIPE_URL = reverse("recipe:recipe-list")
+SEARCH_URL = reverse("recipe:recipe-search")
+ME_URL = reverse("user:me")
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], DB_REPLICA_STICKY_SECONDS=60)
+class ReplicaRouterTests(TransactionTestCase):
+    """Test API reads served from a second alias of the test database"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Added once the test database exists, the replica connection reads
+        # the data the primary connection committed.
+        connections.settings[REPLICA] = {
+            **connections.settings[DEFAULT_DB_ALIAS]
+        }
+        cls.databases = {DEFAULT_DB_ALIAS, REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        pool.close_pools(REPLICA)
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        caches[settings.API_CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create_user("user@example.com")
+        Recipe.objects.create(
+            user=self.user, title="Pie", time_minutes=5, price="1.50"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _request(self, method, url, data=None):
+        """Send a request, return its queries on the primary and replica."""
+        with CaptureQueriesContext(
+            connections[DEFAULT_DB_ALIAS]
+        ) as primary, CaptureQueriesContext(connections[REPLICA]) as replica:
+            res = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(res.status_code, 300)
+        return res, len(primary), len(replica)
+
+    def test_reads_served_from_replica(self):
+        """Test safe requests only query the replica"""
+        res, primary, replica = self._request("get", RECIPE_URL)
+
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_search_served_from_replica(self):
+        """Test searching reads from the replica despite its method"""
+        _, primary, replica = self._request("post", SEARCH_URL, {})
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+        self.assertFalse(routers.is_pinned(self.user.id))
+
+    def test_writes_pin_reads_to_primary(self):
+        """Test the user's reads go to the primary after a write"""
+        payload = {"title": "Soup", "time_minutes": 10, "price": "2.00"}
+        _, primary, replica = self._request("post", RECIPE_URL, payload)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        res, primary, replica = self._request("get", RECIPE_URL)
+
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_failed_write_not_pinned(self):
+        """Test a rejected write leaves the user's reads on the replica"""
+        res = self.client.post(RECIPE_URL, {"title": ""}, format="json")
+
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(routers.is_pinned(self.user.id))
+
+    def test_profile_update_pins_reads(self):
+        """Test updating the user profile pins the user's reads"""
+        self._request("patch", ME_URL, {"name": "New name"})
+
+        _, primary, replica = self._request("get", RECIPE_URL)
+
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_pin_expires(self):
+        """Test reads go back to the replica after the sticky window"""
+        payload = {"title": "Soup", "time_minutes": 10, "price": "2.00"}
+        with override_settings(DB_REPLICA_STICKY_SECONDS=0):
+            self._request("post", RECIPE_URL, payload)
+
+        _, primary, replica = self._request("get", RECIPE_URL)
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_other_users_not_pinned(self):
+        """Test a write only pins the reads of its user"""
+        other = get_user_model().objects.create_user("other@example.com")
+        routers.pin_to_primary(self.user.id)
+
+        self.assertIsNone(routers.replica_for(self.user.id))
+        self.assertEqual(routers.replica_for(other.id), REPLICA)
+        self.assertIsNone(routers.replica_for(None))
+
+    def test_router_writes_and_migrates_primary(self):
+        """Test writes go to the primary and replicas are not migrated"""
+        router = routers.ReplicaRouter()
+        recipe = Recipe.objects.using(REPLICA).get()
+
+        self.assertEqual(
+            router.db_for_write(Recipe, instance=recipe), "default"
+        )
+        self.assertFalse(router.allow_migrate(REPLICA, "core"))
+        self.assertIsNone(router.allow_migrate(DEFAULT_DB_ALIAS, "core"))
+        self.assertTrue(router.allow_relation(recipe, self.user))
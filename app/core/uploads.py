@@ -0,0 +1,148 @@
+"""
+Size limited and resumable image uploads.
+"""
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    StopUpload,
+    TemporaryFileUploadHandler,
+)
+from django.utils import timezone
+
+from core.models import ImageUpload
+
+CHUNK_SIZE = 64 * 1024
+# Allowance for the multipart boundaries and headers around the file.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when more bytes are sent than allowed."""
+
+
+class OffsetMismatch(Exception):
+    """Raised when a chunk does not start where the upload stopped."""
+
+    def __init__(self, offset):
+        super().__init__(offset)
+        self.offset = offset
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploaded files to disk, stopping past ``max_bytes``."""
+
+    def __init__(self, max_bytes, request=None):
+        super().__init__(request)
+        self.max_bytes = max_bytes
+        self.received = 0
+        self.exceeded = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.exceeded = True
+            # Stop reading the body, the temporary file is deleted.
+            raise StopUpload(connection_reset=True)
+        return super().receive_data_chunk(raw_data, start)
+
+
+def limit_upload(request, max_bytes):
+    """Make the request stream its files to disk up to ``max_bytes``.
+
+    Must be called before the request body is read. Raises UploadTooLarge
+    when the declared body length is already over the limit.
+    """
+    content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    if content_length > max_bytes + MULTIPART_OVERHEAD:
+        raise UploadTooLarge()
+    handler = LimitedUploadHandler(max_bytes, request)
+    request.upload_handlers = [handler]
+    return handler
+
+
+def partial_path(upload):
+    """Return the path of the bytes received so far for an upload."""
+    return os.path.join(settings.IMAGE_UPLOAD_DIR, str(upload.id))
+
+
+def get_offset(upload):
+    """Return the number of bytes received for an upload."""
+    try:
+        return os.path.getsize(partial_path(upload))
+    except FileNotFoundError:
+        return 0
+
+
+def receive_chunk(upload, stream, offset):
+    """Spool a chunk sent for an upload to a temporary file.
+
+    The chunk is read before taking the upload's lock, so slow clients do
+    not hold it. A chunk interrupted by the client keeps the bytes
+    received, a chunk going past the upload size is discarded.
+    """
+    received = get_offset(upload)
+    if received != offset:
+        raise OffsetMismatch(received)
+    os.makedirs(settings.IMAGE_UPLOAD_DIR, exist_ok=True)
+    spool = tempfile.TemporaryFile(dir=settings.IMAGE_UPLOAD_DIR)
+    try:
+        while True:
+            try:
+                chunk = stream.read(CHUNK_SIZE)
+            except OSError:
+                break
+            if not chunk:
+                break
+            if offset + spool.tell() + len(chunk) > upload.size:
+                raise UploadTooLarge()
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def append_chunk(upload, spool, offset):
+    """Append a spooled chunk to the upload at ``offset``.
+
+    Returns the new offset. Callers hold the upload's lock.
+    """
+    with open(partial_path(upload), "ab") as f:
+        if f.tell() != offset:
+            raise OffsetMismatch(f.tell())
+        shutil.copyfileobj(spool, f)
+        return f.tell()
+
+
+def delete_upload(upload):
+    """Delete an upload and the bytes received for it."""
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def delete_expired():
+    """Delete the uploads left unfinished for IMAGE_UPLOAD_EXPIRY seconds."""
+    expiry = settings.IMAGE_UPLOAD_EXPIRY
+    ImageUpload.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=expiry)
+    ).delete()
+    # Also removes the files of uploads deleted with their recipe.
+    try:
+        entries = list(os.scandir(settings.IMAGE_UPLOAD_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.stat().st_mtime < time.time() - expiry:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
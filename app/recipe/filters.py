@@ -0,0 +1,60 @@
+"""
+Filters for the recipe APIs.
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, F
+
+from core.models import Recipe
+from core.search import SEARCH_CONFIG
+
+MATCH_ANY = "any"
+MATCH_ALL = "all"
+
+
+def _linked_recipe_ids(field_name, ids, match):
+    """Return a subquery of recipe ids linked to any or all of ids."""
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through
+    ids = set(ids)
+    links = through.objects.filter(
+        **{f"{field.m2m_reverse_field_name()}_id__in": ids}
+    ).values("recipe_id")
+
+    if match == MATCH_ALL:
+        return (
+            links.annotate(matched=Count("id"))
+            .filter(matched=len(ids))
+            .values("recipe_id")
+        )
+    return links
+
+
+def filter_by_related(queryset, related_ids, match=MATCH_ANY):
+    """Filter recipes by tag and ingredient ids.
+
+    ``related_ids`` maps ``"tags"`` and ``"ingredients"`` to lists of ids.
+    The through tables are only read in one nested ``IN`` subquery, so
+    each recipe is returned once without a DISTINCT over the whole result
+    and the planner can start from the most selective list.
+    """
+    matching = None
+    for field_name, ids in related_ids.items():
+        if not ids:
+            continue
+        recipe_ids = _linked_recipe_ids(field_name, ids, match)
+        if matching is not None:
+            recipe_ids = recipe_ids.filter(recipe_id__in=matching)
+        matching = recipe_ids
+
+    if matching is None:
+        return queryset
+    return queryset.filter(pk__in=matching)
+
+
+def search_recipes(queryset, text):
+    """Filter recipes matching a web style search, annotated with rank."""
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F("search_vector"), query)
+    )
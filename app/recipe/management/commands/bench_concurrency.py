@@ -0,0 +1,181 @@
+"""
+Django command for benchmarking the API under many concurrent clients.
+"""
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core import benchmarks
+from core.models import Recipe
+
+SERVERS = {
+    "wsgi": [sys.executable, "manage.py", "runserver", "--noreload"],
+    "asgi": [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "app.asgi:application",
+        "--no-access-log",
+        "--log-level=warning",
+    ],
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    """Django command to compare WSGI and ASGI under concurrent clients"""
+
+    help = (
+        "Seed a dataset, start the API with runserver (WSGI) and uvicorn "
+        "(ASGI) and have many concurrent clients, sending their requests "
+        "slowly, read recipe lists, details, tags and ingredients. Prints "
+        "the throughput and latency percentiles of both."
+    )
+
+    def add_arguments(self, parser):
+        benchmarks.add_seed_arguments(parser)
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=200,
+            help="Concurrent clients.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=5,
+            help="Requests sent by each client.",
+        )
+        parser.add_argument(
+            "--client-delay",
+            type=float,
+            default=0.5,
+            help="Seconds clients wait between sending request headers.",
+        )
+        parser.add_argument(
+            "--servers",
+            default="wsgi,asgi",
+            help="Comma separated servers to benchmark.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        servers = options["servers"].split(",")
+        if set(servers) - set(SERVERS):
+            raise CommandError(f"Servers must be among {', '.join(SERVERS)}")
+        self.options = options
+        user = benchmarks.seed_users(self.stdout, options)
+        token = Token.objects.get_or_create(user=user)[0].key
+        recipe_id = Recipe.objects.filter(user=user).latest("id").id
+        self.paths = [
+            reverse("recipe:recipe-list") + "?page_size=20",
+            reverse("recipe:recipe-detail", args=[recipe_id]),
+            reverse("recipe:tag-list") + "?page_size=20",
+            reverse("recipe:ingredient-list") + "?page_size=20",
+        ]
+        self.headers = f"Host: localhost\r\nAuthorization: Token {token}\r\n"
+
+        for server in servers:
+            port = _free_port()
+            process = self._start(server, port)
+            try:
+                latencies, errors, elapsed = asyncio.run(self._load(port))
+            finally:
+                process.terminate()
+                process.wait()
+            self._report(server, latencies, errors, elapsed)
+
+        if options["cleanup"]:
+            benchmarks.delete_users(self.stdout)
+
+    def _start(self, server, port):
+        """Start a server and wait until it accepts connections."""
+        command = SERVERS[server] + (
+            [f"127.0.0.1:{port}"]
+            if server == "wsgi"
+            else ["--host=127.0.0.1", f"--port={port}"]
+        )
+        process = subprocess.Popen(
+            command,
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), 1).close()
+                return process
+            except OSError:
+                if process.poll() is not None:
+                    break
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError(f"The {server} server did not start")
+
+    async def _load(self, port):
+        """Run all clients, return latencies, errors and elapsed time."""
+        latencies = []
+        errors = 0
+
+        async def client(n):
+            nonlocal errors
+            for i in range(self.options["requests"]):
+                path = self.paths[(n + i) % len(self.paths)]
+                try:
+                    latencies.append(await self._request(port, path))
+                except (OSError, ValueError, asyncio.IncompleteReadError):
+                    errors += 1
+
+        started = time.monotonic()
+        await asyncio.gather(
+            *(client(n) for n in range(self.options["clients"]))
+        )
+        return latencies, errors, time.monotonic() - started
+
+    async def _request(self, port, path):
+        """Send a request slowly and read the response, return seconds."""
+        started = time.monotonic()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            writer.write(f"GET {path} HTTP/1.1\r\n".encode())
+            await writer.drain()
+            await asyncio.sleep(self.options["client_delay"])
+            writer.write(f"{self.headers}Connection: close\r\n\r\n".encode())
+            await writer.drain()
+            status = await reader.readline()
+            if b" 200 " not in status:
+                raise ValueError(status)
+            await reader.read()
+        finally:
+            writer.close()
+        return time.monotonic() - started
+
+    def _report(self, server, latencies, errors, elapsed):
+        """Print the throughput and latency percentiles of a server."""
+        if len(latencies) < 2:
+            self.stdout.write(f"{server}  {errors} errors, no responses")
+            return
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{server}  {len(latencies) / elapsed:7.1f} req/s  "
+            f"p50 {percentiles[49] * 1000:7.1f}ms  "
+            f"p95 {percentiles[94] * 1000:7.1f}ms  "
+            f"p99 {percentiles[98] * 1000:7.1f}ms  "
+            f"{errors} errors"
+        )
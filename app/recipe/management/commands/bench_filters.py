@@ -0,0 +1,64 @@
+"""
+Django command for benchmarking the recipe tag and ingredient filters.
+"""
+from django.core.management.base import BaseCommand
+
+from core import benchmarks
+from core.models import Recipe, Tag, Ingredient
+from recipe.filters import MATCH_ANY, MATCH_ALL, filter_by_related
+
+
+class Command(BaseCommand):
+    """Django command to compare join and semi-join recipe filters"""
+
+    help = (
+        "Seed a large dataset and time the recipe list filtered by many "
+        "tag and ingredient ids, using chained joins and the semi-join "
+        "filters."
+    )
+
+    def add_arguments(self, parser):
+        benchmarks.add_seed_arguments(parser)
+        parser.add_argument(
+            "--ids", type=int, default=50, help="Ids per filter."
+        )
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        user = benchmarks.seed_users(self.stdout, options)
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list("id", flat=True)[
+                : options["ids"]
+            ]
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(user=user).values_list("id", flat=True)[
+                : options["ids"]
+            ]
+        )
+        recipes = Recipe.objects.filter(user=user)
+
+        joined = recipes.filter(tags__id__in=tag_ids).filter(
+            ingredients__id__in=ingredient_ids
+        )
+        queries = {"join": joined, "join distinct": joined.distinct()}
+        for match in (MATCH_ANY, MATCH_ALL):
+            queries[f"semi-join {match}"] = filter_by_related(
+                recipes,
+                {"tags": tag_ids, "ingredients": ingredient_ids},
+                match,
+            )
+
+        for name, queryset in queries.items():
+            page = queryset.order_by("-id")[:50]
+            rows = queryset.count()
+            median, p95 = benchmarks.time_call(
+                lambda: list(page.all()), options["runs"]
+            )
+            self.stdout.write(
+                f"{name:<16} rows {rows:>8}  "
+                f"median {median:7.2f}ms  p95 {p95:7.2f}ms"
+            )
+
+        if options["cleanup"]:
+            benchmarks.delete_users(self.stdout)
@@ -0,0 +1,68 @@
+"""
+Django command for benchmarking the API renderers.
+"""
+import gzip
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from core import benchmarks
+from core.models import Recipe
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+from recipe.representations import RecipeRows
+from recipe.serializers import RecipeSerializer
+
+RENDERERS = {
+    "json": JSONRenderer,
+    "fast json": FastJSONRenderer,
+    "msgpack": MessagePackRenderer,
+}
+
+
+class Command(BaseCommand):
+    """Django command to compare the render time and size of renderers"""
+
+    help = (
+        "Seed a large dataset and time rendering a recipe list with each "
+        "API renderer, with the size of the payload and of its gzip."
+    )
+
+    def add_arguments(self, parser):
+        benchmarks.add_seed_arguments(parser)
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=1000,
+            help="Recipes in the rendered list.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        user = benchmarks.seed_users(self.stdout, options)
+        context = {"request": RequestFactory().get("/api/recipe/recipes/")}
+        rows = RecipeRows(RecipeSerializer, context)
+        recipes = Recipe.objects.filter(user=user).order_by("-id")
+        data = {
+            "next": None,
+            "previous": None,
+            "results": rows.to_representation(
+                rows.values(recipes)[: options["size"]]
+            ),
+        }
+        self.stdout.write(f"Rendering {len(data['results'])} recipes")
+
+        for name, renderer_class in RENDERERS.items():
+            renderer = renderer_class()
+            payload = renderer.render(data)
+            median, p95 = benchmarks.time_call(
+                lambda: renderer.render(data), options["runs"]
+            )
+            self.stdout.write(
+                f"{name:<10} median {median:7.2f}ms  p95 {p95:7.2f}ms  "
+                f"{len(payload):>9} bytes  "
+                f"{len(gzip.compress(payload)):>8} gzipped"
+            )
+
+        if options["cleanup"]:
+            benchmarks.delete_users(self.stdout)
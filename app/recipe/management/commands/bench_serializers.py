@@ -0,0 +1,67 @@
+"""
+Django command for benchmarking the recipe list representation.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from core import benchmarks
+from core.models import Recipe
+from recipe.representations import RELATIONS, RecipeRows, related_prefetches
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Django command to compare the recipe serializer and rows"""
+
+    help = (
+        "Seed a large dataset and time reading and rendering recipe lists "
+        "to JSON with RecipeSerializer and with the values() rows used by "
+        "the list and export, checking both render the same bytes."
+    )
+
+    def add_arguments(self, parser):
+        benchmarks.add_seed_arguments(parser)
+        parser.add_argument(
+            "--sizes",
+            default="1000,10000",
+            help="Comma separated numbers of recipes rendered at once.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        if max(sizes) > options["recipes"]:
+            raise CommandError("--sizes cannot be larger than --recipes")
+        user = benchmarks.seed_users(self.stdout, options)
+        context = {"request": RequestFactory().get("/api/recipe/recipes/")}
+        renderer = JSONRenderer()
+
+        for size in sizes:
+            recipes = Recipe.objects.filter(user=user).order_by("-id")
+
+            def serializer():
+                page = recipes.defer("search_vector").prefetch_related(
+                    *related_prefetches(RELATIONS)
+                )[:size]
+                data = RecipeSerializer(page, many=True, context=context).data
+                return renderer.render(data)
+
+            def rows():
+                representation = RecipeRows(RecipeSerializer, context)
+                page = representation.values(recipes)[:size]
+                return renderer.render(representation.to_representation(page))
+
+            if serializer() != rows():
+                raise CommandError(f"Rendered output differs for {size}")
+            for name, func in [("serializer", serializer), ("rows", rows)]:
+                median, p95 = benchmarks.time_call(func, options["runs"])
+                self.stdout.write(
+                    f"{size:>6} recipes {name:<10} "
+                    f"median {median:8.2f}ms  p95 {p95:8.2f}ms  "
+                    f"{size / median * 1000:9.0f} recipes/s"
+                )
+
+        if options["cleanup"]:
+            benchmarks.delete_users(self.stdout)
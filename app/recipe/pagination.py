@@ -0,0 +1,80 @@
+"""
+Pagination classes for the recipe APIs.
+"""
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+NAME_ORDERING = "name"
+POPULAR_ORDERING = "popular"
+
+
+class OffsetPagination(LimitOffsetPagination):
+    """Offset pagination taking the page size like the cursor pagination."""
+
+    default_limit = settings.API_PAGE_SIZE
+    limit_query_param = "page_size"
+    max_limit = settings.API_MAX_PAGE_SIZE
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination over recipes, newest first.
+
+    Orderings without a unique key, like search ranks, are paged by offset
+    instead.
+    """
+
+    ordering = "-id"
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    offset_paginator = None
+
+    def get_offset_ordering(self, request, queryset, view):
+        """Return the ordering to page by offset, None to use cursors.
+
+        Search results are ordered by relevance. Ranks are rounded floats
+        shared by many rows, a cursor on them skips or repeats results.
+        """
+        if "rank" in queryset.query.annotations:
+            return ("-rank", "-id")
+        return None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_offset_ordering(request, queryset, view)
+        if ordering is None:
+            self.offset_paginator = None
+            return super().paginate_queryset(queryset, request, view)
+        self.offset_paginator = OffsetPagination()
+        return self.offset_paginator.paginate_queryset(
+            queryset.order_by(*ordering), request, view
+        )
+
+    def get_paginated_response(self, data):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    """Keyset pagination over tags and ingredients by name."""
+
+    ordering = "-name"
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get("ordering") == NAME_ORDERING:
+            return ("name",)
+        return super().get_ordering(request, queryset, view)
+
+    def get_offset_ordering(self, request, queryset, view):
+        """Page by offset when ordered by the number of recipes.
+
+        Counts are shared by many items, a cursor on them skips or repeats
+        items.
+        """
+        if (
+            request.query_params.get("ordering") == POPULAR_ORDERING
+            and "recipe_count" in queryset.query.annotations
+        ):
+            return ("-recipe_count", "-name")
+        return super().get_offset_ordering(request, queryset, view)
@@ -3,34 +3,140 @@ Serializers for recipe APIs
 """
 
 
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext as _
 from rest_framework import serializers
 
-from core.models import Recipe, Tag, Ingredient
+from core import bulk, cache, images, search, uploads
+from core.models import ImageUpload, Recipe, Tag, Ingredient
+from core.storage import image_storage
+from recipe.filters import MATCH_ANY, MATCH_ALL
+from recipe.pagination import NAME_ORDERING, POPULAR_ORDERING
 
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Serializer for the ingredients."""
 
+    # Only present when the queryset is annotated with it.
+    recipe_count = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Ingredient
-        fields = ["id", "name"]
+        fields = ["id", "name", "recipe_count"]
         read_only_fields = ["id"]
 
 
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for tags"""
 
+    # Only present when the queryset is annotated with it.
+    recipe_count = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Tag
-        fields = ["id", "name"]
+        fields = ["id", "name", "recipe_count"]
         read_only_fields = ["id"]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class AutocompleteQuerySerializer(serializers.Serializer):
+    """Query parameters of the tag and ingredient autocomplete."""
+
+    prefix = serializers.CharField(max_length=255, trim_whitespace=False)
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.API_AUTOCOMPLETE_MAX_LIMIT,
+        default=settings.API_AUTOCOMPLETE_LIMIT,
+    )
+
+
+class RecipeAttrQuerySerializer(serializers.Serializer):
+    """Query parameters of the tag and ingredient lists."""
+
+    assigned_only = serializers.BooleanField(
+        default=False, help_text="Filter by items assigned to recipes."
+    )
+    with_counts = serializers.BooleanField(
+        default=False,
+        help_text="Include the number of recipes using each item.",
+    )
+    ordering = serializers.ChoiceField(
+        [NAME_ORDERING, POPULAR_ORDERING],
+        required=False,
+        help_text=(
+            "Order by name, descending unless set, or by the number of "
+            "recipes using each item, most used first."
+        ),
+    )
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """URLs of the resized recipe images generated so far."""
+
+    def to_representation(self, value):
+        request = self.context.get("request")
+        urls = {}
+        for variant, name in value.items():
+            url = image_storage.url(name)
+            urls[variant] = request.build_absolute_uri(url) if request else url
+        return urls
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Serializer for creating many recipes with batched inserts."""
+
+    def to_internal_value(self, data):
+        """Reject oversized batches before validating any item."""
+        if isinstance(data, list) and len(data) > settings.API_MAX_BULK_CREATE:
+            msg = _("Ensure this list has no more than {limit} items.")
+            raise serializers.ValidationError(
+                msg.format(limit=settings.API_MAX_BULK_CREATE),
+                code="max_length",
+            )
+        return super().to_internal_value(data)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Create recipes, their tags and ingredients in bulk."""
+        tags = [item.pop("tags", []) for item in validated_data]
+        ingredients = [item.pop("ingredients", []) for item in validated_data]
+        recipes = Recipe.objects.bulk_create(
+            [Recipe(**item) for item in validated_data],
+            batch_size=settings.API_MAX_BULK_CREATE,
+        )
+        self.child._add_by_name(
+            Tag, Recipe.tags.through, list(zip(recipes, tags))
+        )
+        self.child._add_by_name(
+            Ingredient,
+            Recipe.ingredients.through,
+            list(zip(recipes, ingredients)),
+        )
+        search.update_search_vectors([recipe.id for recipe in recipes])
+        for user_id in {recipe.user_id for recipe in recipes}:
+            cache.bump_version(user_id)
+        return recipes
+
+
+class SparseFieldsetMixin:
+    """Render only the fields in the ``fields`` entry of the context."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.context.get("fields")
+        if requested is None:
+            return fields
+        return {
+            name: field for name, field in fields.items() if name in requested
+        }
+
+
+class RecipeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for recipes."""
 
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -42,27 +148,38 @@ class RecipeSerializer(serializers.ModelSerializer):
             "link",
             "tags",
             "ingredients",
+            "image_variants",
         ]
         read_only_fields = ["id"]
+        list_serializer_class = RecipeListSerializer
+
+    def _add_by_name(self, model, through, recipe_items):
+        """Get or create the user's objects by name and link them to recipes.
+
+        ``recipe_items`` is a list of ``(recipe, items)`` pairs. Runs in a
+        fixed number of queries however many recipes and items are given.
+        """
+        auth_user = self.context["request"].user
+        names = {item["name"] for _, items in recipe_items for item in items}
+        ids = bulk.get_or_create_names(model, auth_user, names)
+        links = {
+            (recipe.id, ids[item["name"]])
+            for recipe, items in recipe_items
+            for item in items
+        }
+        bulk.add_recipe_links(through, model, links)
 
     def _get_or_create_tag(self, tags, recipe):
         """Handle getting or creating tags as needed"""
-        auth_user = self.context["request"].user
-        for tag in tags:
-            tag_object, created = Tag.objects.get_or_create(
-                user=auth_user, **tag
-            )
-            recipe.tags.add(tag_object)
+        self._add_by_name(Tag, Recipe.tags.through, [(recipe, tags)])
 
     def _get_or_create_ingredient(self, ingredients, recipe):
         """Handle getting or creating ingredients as needed"""
-        auth_user = self.context["request"].user
-        for ingredient in ingredients:
-            ingredient_object, created = Ingredient.objects.get_or_create(
-                user=auth_user, **ingredient
-            )
-            recipe.ingredients.add(ingredient_object)
+        self._add_by_name(
+            Ingredient, Recipe.ingredients.through, [(recipe, ingredients)]
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe."""
         tags = validated_data.pop("tags", [])
@@ -70,8 +187,11 @@ class RecipeSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         self._get_or_create_tag(tags, recipe)
         self._get_or_create_ingredient(ingredients, recipe)
+        search.update_search_vectors([recipe.id])
+        cache.bump_version(recipe.user_id)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Update a recipe."""
         tags = validated_data.pop("tags", None)
@@ -89,6 +209,8 @@ class RecipeSerializer(serializers.ModelSerializer):
             setattr(instance, attribute, value)
 
         instance.save()
+        search.update_search_vectors([instance.id])
+        cache.bump_version(instance.user_id)
         return instance
 
 
@@ -99,11 +221,63 @@ class RecipeDetailSerializer(RecipeSerializer):
         fields = RecipeSerializer.Meta.fields + ["description"]
 
 
+class RecipeSearchSerializer(serializers.Serializer):
+    """Serializer for recipe filters."""
+
+    tags = serializers.ListField(
+        child=serializers.IntegerField(), required=False
+    )
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(), required=False
+    )
+    match = serializers.ChoiceField(
+        choices=[MATCH_ANY, MATCH_ALL], default=MATCH_ANY
+    )
+    search = serializers.CharField(required=False, allow_blank=True)
+
+
+class RecipeBulkCreateResultSerializer(serializers.Serializer):
+    """Serializer for the result of a bulk recipe create."""
+
+    id = serializers.IntegerField(read_only=True)
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes."""
 
+    image = serializers.FileField()
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ["id", "image"]
+        fields = ["id", "image", "image_variants"]
         read_only_fields = ["id"]
-        extra_kwargs = {"image": {"required": "True"}}
+
+    def validate_image(self, value):
+        """Check the image format and size from its header only."""
+        images.check_image_header(value)
+        return value
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """Serializer for chunked image uploads."""
+
+    offset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImageUpload
+        fields = ["id", "size", "offset"]
+        read_only_fields = ["id"]
+
+    def validate_size(self, value):
+        """Reject uploads larger than the image upload limit."""
+        if value > settings.IMAGE_UPLOAD_MAX_BYTES:
+            msg = _("Ensure the image is no larger than {limit} bytes.")
+            raise serializers.ValidationError(
+                msg.format(limit=settings.IMAGE_UPLOAD_MAX_BYTES),
+                code="max_value",
+            )
+        return value
+
+    def get_offset(self, upload) -> int:
+        return uploads.get_offset(upload)
@@ -17,6 +17,7 @@ from recipe.serializers import IngredientSerializer
 
 
 INGREDIENTS_URL = reverse("recipe:ingredient-list")
+INGREDIENTS_AUTOCOMPLETE_URL = reverse("recipe:ingredient-autocomplete")
 
 
 def detail_url(ingredient_id):
@@ -70,7 +71,7 @@ class PrivateIngredientsApiTests(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test retrieving a list of ingredients belongs to user"""
@@ -88,7 +89,7 @@ class PrivateIngredientsApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(total_ingredients.count(), 4)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_update_ingredient(self):
         """Test updating an ingredient"""
@@ -132,8 +133,8 @@ class PrivateIngredientsApiTests(TestCase):
         serializer_1 = IngredientSerializer(ingredient_1)
         serializer_2 = IngredientSerializer(ingredient_2)
 
-        self.assertIn(serializer_1.data, res.data)
-        self.assertNotIn(serializer_2.data, res.data)
+        self.assertIn(serializer_1.data, res.data["results"])
+        self.assertNotIn(serializer_2.data, res.data["results"])
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_filtered_ingredients_unique(self):
@@ -156,4 +157,49 @@ class PrivateIngredientsApiTests(TestCase):
         reicpe_2.ingredients.add(ingredient)
 
         res = self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_autocomplete_ingredients(self):
+        """Test ingredients are completed by prefix, most used first."""
+        create_ingredient(user=self.user, name="Salt")
+        salmon = create_ingredient(user=self.user, name="Salmon")
+        create_ingredient(user=self.user, name="Pepper")
+        recipe = Recipe.objects.create(
+            title="Sushi",
+            time_minutes=5,
+            price=Decimal("1.00"),
+            user=self.user,
+        )
+        recipe.ingredients.add(salmon)
+
+        res = self.client.get(INGREDIENTS_AUTOCOMPLETE_URL, {"prefix": "sa"})
+
+        self.assertEqual(
+            res.data,
+            [
+                {"id": salmon.id, "name": "Salmon", "recipe_count": 1},
+                {"id": res.data[1]["id"], "name": "Salt", "recipe_count": 0},
+            ],
+        )
+
+    def test_assigned_ingredients_with_counts(self):
+        """Test assigned ingredients are listed with their recipe counts."""
+        ingredient = create_ingredient(user=self.user, name="Eggs")
+        create_ingredient(user=self.user, name="Lentils")
+        for title in ["Omelette", "Herb eggs"]:
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=Decimal("1.00"),
+                user=self.user,
+            )
+            recipe.ingredients.add(ingredient)
+
+        res = self.client.get(
+            INGREDIENTS_URL, {"assigned_only": 1, "with_counts": 1}
+        )
+
+        self.assertEqual(
+            res.data["results"],
+            [{"id": ingredient.id, "name": "Eggs", "recipe_count": 2}],
+        )
@@ -3,26 +3,56 @@ Tests for recipe APIs.
 """
 
 from decimal import Decimal
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock, patch
+import io
+import json
+import struct
+import zlib
 import tempfile
 import os
 
+import msgpack
 from PIL import Image
 
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
-from core.models import Recipe, Tag, Ingredient
+from core import cache, images, uploads
+from core.models import ImageUpload, Recipe, Tag, Ingredient
+from core.search import update_search_vectors
 
+from recipe.representations import RELATIONS, RecipeRows, related_prefetches
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
 RECIPE_URL = reverse("recipe:recipe-list")
+BULK_CREATE_URL = reverse("recipe:recipe-bulk-create")
+EXPORT_URL = reverse("recipe:recipe-export")
+SEARCH_URL = reverse("recipe:recipe-search")
+
+# For tests writing outside the API, which does not invalidate the cache.
+UNCACHED = override_settings(
+    CACHES={
+        **settings.CACHES,
+        settings.API_CACHE_ALIAS: {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+        },
+    }
+)
 
 
 def detail_url(recipe_id):
@@ -35,6 +65,35 @@ def image_upload_url(recipe_id):
     return reverse("recipe:recipe-upload-image", args=[recipe_id])
 
 
+def image_uploads_url(recipe_id, upload_id=None):
+    """Create and return a chunked image upload URL."""
+    if upload_id is None:
+        return reverse("recipe:recipe-image-uploads", args=[recipe_id])
+    return reverse("recipe:recipe-image-upload", args=[recipe_id, upload_id])
+
+
+def image_bytes(size=(10, 10), image_format="JPEG"):
+    """Return an encoded image."""
+    buffer = io.BytesIO()
+    Image.new("RGB", size).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def png_header(width, height):
+    """Return a PNG with a header for the size and no pixel data."""
+
+    def chunk(kind, data):
+        body = kind + data
+        return (
+            struct.pack(">I", len(data))
+            + body
+            + struct.pack(">I", zlib.crc32(body))
+        )
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IEND", b"")
+
+
 def create_recipe(user, **params):
     """Create and return a sample recipe."""
     defaults = {
@@ -87,7 +146,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes is only for the current user"""
@@ -107,7 +166,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_get_recipe_detail(self):
         """Test get recipe detail."""
@@ -360,6 +419,21 @@ class PrivateRecipeAPITests(TestCase):
         self.assertNotIn(ingredient, recipe.ingredients.all())
         self.assertEqual(recipe.ingredients.count(), 0)
 
+    def test_create_recipe_with_repeated_tags(self):
+        """Test repeated tag names are only created and linked once."""
+        payload = {
+            "title": "sample title",
+            "time_minutes": 30,
+            "price": Decimal("7.99"),
+            "tags": [{"name": "Thai"}, {"name": "Thai"}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_filter_by_tags(self):
         """Test filtering recipes by tags"""
         recipe_1 = create_recipe(user=self.user, title="Thai Vegetable curry")
@@ -376,9 +450,9 @@ class PrivateRecipeAPITests(TestCase):
         serializer_1 = RecipeSerializer(recipe_1)
         serializer_2 = RecipeSerializer(recipe_2)
         serializer_3 = RecipeSerializer(recipe_3)
-        self.assertIn(serializer_1.data, res.data)
-        self.assertIn(serializer_2.data, res.data)
-        self.assertNotIn(serializer_3.data, res.data)
+        self.assertIn(serializer_1.data, res.data["results"])
+        self.assertIn(serializer_2.data, res.data["results"])
+        self.assertNotIn(serializer_3.data, res.data["results"])
 
     def test_filter_by_ingredients(self):
         """Test filtering recipes by ingredients"""
@@ -396,14 +470,859 @@ class PrivateRecipeAPITests(TestCase):
         serializer_1 = RecipeSerializer(recipe_1)
         serializer_2 = RecipeSerializer(recipe_2)
         serializer_3 = RecipeSerializer(recipe_3)
-        self.assertIn(serializer_1.data, res.data)
-        self.assertIn(serializer_2.data, res.data)
-        self.assertNotIn(serializer_3.data, res.data)
+        self.assertIn(serializer_1.data, res.data["results"])
+        self.assertIn(serializer_2.data, res.data["results"])
+        self.assertNotIn(serializer_3.data, res.data["results"])
+
+    def test_filter_by_tags_returns_distinct_recipes(self):
+        """Test recipes matching several tags are returned once."""
+        recipe = create_recipe(user=self.user)
+        tag_1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag_2 = Tag.objects.create(user=self.user, name="Dinner")
+        recipe.tags.add(tag_1, tag_2)
+
+        params = {"tags": f"{tag_1.id},{tag_2.id}"}
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual([r["id"] for r in res.data["results"]], [recipe.id])
+
+    def test_filter_by_all_tags(self):
+        """Test match=all returns recipes having every tag."""
+        tag_1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag_2 = Tag.objects.create(user=self.user, name="Dinner")
+        recipe_1 = create_recipe(user=self.user, title="Vegan dinner")
+        recipe_1.tags.add(tag_1, tag_2)
+        recipe_2 = create_recipe(user=self.user, title="Vegan lunch")
+        recipe_2.tags.add(tag_1)
+
+        params = {"tags": f"{tag_1.id},{tag_2.id}", "match": "all"}
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in res.data["results"]], [recipe_1.id])
+
+    def test_filter_by_all_tags_and_ingredients(self):
+        """Test match=all applies to tags and ingredients together."""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        rice = Ingredient.objects.create(user=self.user, name="Rice")
+        beans = Ingredient.objects.create(user=self.user, name="Beans")
+        recipe_1 = create_recipe(user=self.user, title="Rice and beans")
+        recipe_1.tags.add(tag)
+        recipe_1.ingredients.add(rice, beans)
+        recipe_2 = create_recipe(user=self.user, title="Rice")
+        recipe_2.tags.add(tag)
+        recipe_2.ingredients.add(rice)
+
+        params = {
+            "tags": f"{tag.id}",
+            "ingredients": f"{rice.id},{beans.id}",
+            "match": "all",
+        }
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual([r["id"] for r in res.data["results"]], [recipe_1.id])
+
+    def test_filter_invalid_params(self):
+        """Test invalid filter parameters return an error."""
+        for params in ({"match": "some"}, {"tags": "1,two"}):
+            res = self.client.get(RECIPE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_with_long_id_list(self):
+        """Test filtering by ids posted in the request body."""
+        tags = [
+            Tag.objects.create(user=self.user, name=f"Tag {i}")
+            for i in range(60)
+        ]
+        recipe_1 = create_recipe(user=self.user)
+        recipe_1.tags.add(*tags)
+        recipe_2 = create_recipe(user=self.user)
+        recipe_2.tags.add(*tags[:59])
+
+        payload = {"tags": [tag.id for tag in tags], "match": "all"}
+        res = self.client.post(SEARCH_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"], [RecipeSerializer(recipe_1).data]
+        )
+
+        payload["match"] = "any"
+        res = self.client.post(SEARCH_URL, payload, format="json")
 
+        self.assertEqual(len(res.data["results"]), 2)
+
+
+class RecipeSearchTests(TestCase):
+    """Test full text search over recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="password")
+        self.client.force_authenticate(self.user)
+
+    def _create(self, **params):
+        """Create a recipe through the API and return its id."""
+        payload = {"time_minutes": 10, "price": "5.00"}
+        payload.update(params)
+        res = self.client.post(RECIPE_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data["id"]
+
+    def _search(self, text, **params):
+        """Return the ids of the recipes found for text."""
+        res = self.client.get(RECIPE_URL, {"search": text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [r["id"] for r in res.data["results"]]
+
+    def test_search_title_and_description(self):
+        """Test search matches titles and descriptions by relevance."""
+        in_description = self._create(
+            title="Weeknight dinner", description="A quick curry"
+        )
+        in_title = self._create(title="Thai curry")
+        self._create(title="Fish and chips")
+
+        self.assertEqual(self._search("curries"), [in_title, in_description])
+
+    def test_search_tags_and_ingredients(self):
+        """Test search matches tag and ingredient names."""
+        by_tag = self._create(title="Pad thai", tags=[{"name": "Vegan"}])
+        by_ingredient = self._create(
+            title="Salad", ingredients=[{"name": "Tofu"}]
+        )
+
+        self.assertEqual(self._search("vegan"), [by_tag])
+        self.assertEqual(self._search("tofu"), [by_ingredient])
+
+    def test_search_after_update(self):
+        """Test search reflects updated recipes and tags."""
+        recipe_id = self._create(title="Pancakes", tags=[{"name": "Brunch"}])
+        self.client.patch(
+            detail_url(recipe_id), {"title": "Waffles"}, format="json"
+        )
+        tag = Tag.objects.get(user=self.user, name="Brunch")
+        self.client.patch(
+            reverse("recipe:tag-detail", args=[tag.id]), {"name": "Breakfast"}
+        )
+
+        self.assertEqual(self._search("pancakes"), [])
+        self.assertEqual(self._search("waffles breakfast"), [recipe_id])
+        self.assertEqual(self._search("brunch"), [])
+
+    def test_search_paginated(self):
+        """Test ranked search results can be paged through."""
+        ids = [self._create(title=f"Curry {i}") for i in range(3)]
+
+        res = self.client.get(RECIPE_URL, {"search": "curry", "page_size": 2})
+        found = [r["id"] for r in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        found += [r["id"] for r in res.data["results"]]
+
+        self.assertEqual(sorted(found), sorted(ids))
+        self.assertIsNone(res.data["next"])
+
+    def test_search_pages_with_equal_ranks(self):
+        """Test results sharing a rank are each returned once in order."""
+        ids = [self._create(title="Curry") for _ in range(5)]
+        self._create(title="Curry curry")
+
+        res = self.client.get(RECIPE_URL, {"search": "curry", "page_size": 2})
+        found = [r["id"] for r in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            found += [r["id"] for r in res.data["results"]]
+
+        self.assertEqual(found[1:], sorted(ids, reverse=True))
+
+    @UNCACHED
+    def test_update_search_vectors(self):
+        """Test reindexing recipes created outside the API."""
+        recipe = create_recipe(user=self.user, title="Lasagna")
+        self.assertEqual(self._search("lasagna"), [])
+
+        update_search_vectors([recipe.id])
+
+        self.assertEqual(self._search("lasagna"), [recipe.id])
+
+
+class RecipeListCacheTests(TestCase):
+    """Test caching of the recipe list responses."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="password")
+        self.client.force_authenticate(self.user)
+        create_recipe(user=self.user, title="Cached")
+
+    def test_repeated_list_is_served_from_cache(self):
+        """Test a repeated list request only looks up the cache version."""
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(RECIPE_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(cached.data, res.data)
+
+    def test_query_params_are_cached_separately(self):
+        """Test different filters are separate cache entries."""
+        self.client.get(RECIPE_URL)
+        res = self.client.get(RECIPE_URL, {"search": "nothing"})
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"], [])
+
+    def test_writes_invalidate_cache(self):
+        """Test creating, updating and deleting refresh the list."""
+        self.client.get(RECIPE_URL)
+        res = self.client.post(
+            RECIPE_URL,
+            {"title": "New", "time_minutes": 5, "price": "1.00"},
+            format="json",
+        )
+        recipe_id = res.data["id"]
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"][0]["title"], "New")
+
+        self.client.patch(detail_url(recipe_id), {"title": "Renamed"})
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data["results"][0]["title"], "Renamed")
 
+        self.client.delete(detail_url(recipe_id))
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data["results"][0]["title"], "Cached")
+
+    def test_cache_is_per_user(self):
+        """Test users never see each other's cached lists."""
+        self.client.get(RECIPE_URL)
+        other = create_user(email="other@example.com", password="password")
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"], [])
+
+    def test_command_writes_invalidate_cache(self):
+        """Test recipes imported by a command refresh the list."""
+        self.client.get(RECIPE_URL)
+        record = {"title": "Imported", "time_minutes": 5, "price": "1.00"}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "recipes.ndjson")
+            with open(path, "w") as f:
+                f.write(json.dumps(record) + "\n")
+            call_command(
+                "import_recipes",
+                path,
+                "--user",
+                self.user.email,
+                stdout=io.StringIO(),
+            )
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"][0]["title"], "Imported")
+
+    def test_hits_and_misses_are_counted(self):
+        """Test the cache statistics count hits and misses."""
+        before = cache.get_stats()
+
+        self.client.get(RECIPE_URL)
+        self.client.get(RECIPE_URL)
+
+        after = cache.get_stats()
+        self.assertEqual(after["misses"] - before["misses"], 1)
+        self.assertEqual(after["hits"] - before["hits"], 1)
+
+
+class RecipeConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling of the recipe API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="password")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user, title="Soup")
+
+    def test_list_not_modified(self):
+        """Test an unchanged list is answered with a 304."""
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["ETag"].startswith('"'))
+        self.assertNotIn("Last-Modified", res)
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b"")
+
+    def test_cached_list_not_modified(self):
+        """Test a cached list still answers conditional requests."""
+        etag = self.client.get(RECIPE_URL)["ETag"]
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_detail_not_modified(self):
+        """Test an unchanged recipe is answered with a 304."""
+        url = detail_url(self.recipe.id)
+        res = self.client.get(url)
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+        not_modified = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=res["Last-Modified"]
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_etag_changes_on_update(self):
+        """Test updating a recipe changes the list and detail ETags."""
+        url = detail_url(self.recipe.id)
+        list_etag = self.client.get(RECIPE_URL)["ETag"]
+        detail_etag = self.client.get(url)["ETag"]
+
+        self.client.patch(url, {"title": "Stew"})
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["title"], "Stew")
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_etag_changes_on_delete(self):
+        """Test deleting a recipe changes the list ETag."""
+        create_recipe(user=self.user, title="Salad")
+        etag = self.client.get(RECIPE_URL)["ETag"]
+
+        self.client.delete(detail_url(self.recipe.id))
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_list_modified_since_after_delete(self):
+        """Test a list is not answered 304 by date after a delete."""
+        create_recipe(user=self.user, title="Salad")
+        url = detail_url(self.recipe.id)
+        last_modified = self.client.get(url)["Last-Modified"]
+
+        self.client.delete(url)
+        res = self.client.get(RECIPE_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_tag_rename_touches_recipes(self):
+        """Test renaming a tag marks its recipes as modified."""
+        tag = Tag.objects.create(user=self.user, name="Hot")
+        self.recipe.tags.add(tag)
+        updated_at = Recipe.objects.get(pk=self.recipe.pk).updated_at
+
+        url = reverse("recipe:tag-detail", args=[tag.id])
+        self.client.patch(url, {"name": "Warm"})
+
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, updated_at)
+
+    def test_missing_recipe_not_found(self):
+        """Test conditional requests for unknown recipes return 404."""
+        res = self.client.get(detail_url(0), HTTP_IF_NONE_MATCH="*")
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RecipePaginationTests(TestCase):
+    """Test cursor pagination of the recipe list."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="password")
+        self.client.force_authenticate(self.user)
+
+    def test_list_recipes_paginated(self):
+        """Test recipes are returned in pages linked by cursors."""
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+
+        res = self.client.get(RECIPE_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]],
+            [recipes[2].id, recipes[1].id],
+        )
+        self.assertIsNone(res.data["previous"])
+        self.assertIsNotNone(res.data["next"])
+
+        res = self.client.get(res.data["next"])
+
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]], [recipes[0].id]
+        )
+        self.assertIsNone(res.data["next"])
+        self.assertIsNotNone(res.data["previous"])
+
+    @patch("recipe.pagination.RecipeCursorPagination.max_page_size", 2)
+    def test_page_size_limited_to_maximum(self):
+        """Test requested page sizes are capped at the maximum."""
+        for _ in range(3):
+            create_recipe(user=self.user)
+
+        res = self.client.get(RECIPE_URL, {"page_size": 100})
+
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_pages_stable_during_writes(self):
+        """Test new recipes do not shift the following pages."""
+        recipes = [create_recipe(user=self.user) for _ in range(4)]
+
+        res = self.client.get(RECIPE_URL, {"page_size": 2})
+        create_recipe(user=self.user)
+        res = self.client.get(res.data["next"])
+
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]],
+            [recipes[1].id, recipes[0].id],
+        )
+
+
+@UNCACHED
+class RecipeQueryBudgetTests(TestCase):
+    """Test the number of queries used by the recipe API.
+
+    Lists use one query for the cache version, reads one for the ETag, one
+    for the recipes and one per prefetched relation.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="password")
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name="Rice"
+        )
+
+    def _create_recipes(self, count):
+        """Create recipes with a tag and an ingredient each."""
+        for i in range(count):
+            recipe = create_recipe(user=self.user, title=f"Recipe {i}")
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+
+    def test_list_query_count_is_constant(self):
+        """Test listing recipes does not query per recipe."""
+        self._create_recipes(2)
+        with self.assertNumQueries(5):
+            res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data["results"]), 2)
+
+        self._create_recipes(8)
+        with self.assertNumQueries(5):
+            res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data["results"]), 10)
+
+    def test_filtered_list_query_count_is_constant(self):
+        """Test filtering recipes does not query per recipe."""
+        self._create_recipes(10)
+        params = {
+            "tags": f"{self.tag.id}",
+            "ingredients": f"{self.ingredient.id}",
+        }
+
+        with self.assertNumQueries(5):
+            res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(len(res.data["results"]), 10)
+
+    def test_detail_query_count(self):
+        """Test retrieving a recipe loads relations in fixed queries."""
+        self._create_recipes(1)
+        recipe = Recipe.objects.get(user=self.user)
+
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(len(res.data["tags"]), 1)
+        self.assertEqual(len(res.data["ingredients"]), 1)
+
+    def _count_create_queries(self, ingredient_count):
+        """Return the queries used to create a recipe with ingredients."""
+        payload = {
+            "title": "sample title",
+            "time_minutes": 30,
+            "price": Decimal("7.99"),
+            "tags": [{"name": f"Tag {ingredient_count}"}],
+            "ingredients": [
+                {"name": f"Ingredient {ingredient_count} {i}"}
+                for i in range(ingredient_count)
+            ],
+        }
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(RECIPE_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["ingredients"]), ingredient_count)
+        return len(queries)
+
+    def test_create_query_count_is_constant(self):
+        """Test nested tags and ingredients are written in bulk."""
+        self.assertEqual(
+            self._count_create_queries(2), self._count_create_queries(30)
+        )
+
+    def test_update_query_count_is_constant(self):
+        """Test replacing nested ingredients is written in bulk."""
+        recipe = create_recipe(user=self.user)
+        url = detail_url(recipe.id)
+        counts = []
+        for ingredient_count in (2, 30):
+            payload = {
+                "ingredients": [
+                    {"name": f"Ingredient {ingredient_count} {i}"}
+                    for i in range(ingredient_count)
+                ]
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.patch(url, payload, format="json")
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(recipe.ingredients.count(), 30)
+
+
+class RecipeRenderersTests(TestCase):
+    """Test the recipe APIs render the accepted media types."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="password")
+        self.client.force_authenticate(self.user)
+        recipe = create_recipe(
+            user=self.user, title="Cr\u00e8me br\u00fbl\u00e9e"
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Dessert"))
+
+    def test_list_as_json(self):
+        """Test JSON responses render like DRF's JSON renderer."""
+        res = self.client.get(RECIPE_URL, HTTP_ACCEPT="application/json")
+
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertEqual(res.content, JSONRenderer().render(res.data))
+
+    def test_list_as_msgpack(self):
+        """Test MessagePack is returned when accepted."""
+        json_res = self.client.get(RECIPE_URL)
+        res = self.client.get(RECIPE_URL, HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(res["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(res.content), json_res.json())
+        self.assertLess(len(res.content), len(json_res.content))
+
+    def test_detail_format_override(self):
+        """Test ?format= selects the renderer."""
+        recipe = Recipe.objects.get(user=self.user)
+
+        res = self.client.get(detail_url(recipe.id), {"format": "msgpack"})
+
+        self.assertEqual(res["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(res.content)["title"], recipe.title)
+
+
+class RecipeRowsTests(TestCase):
+    """Test recipe rows render like the recipe serializers."""
+
+    def setUp(self):
+        self.user = create_user(email="user@example.com", password="password")
+        self.request = RequestFactory().get(RECIPE_URL)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ["Vegan", "Dinner", "Quick"]
+        ]
+        rice = Ingredient.objects.create(user=self.user, name="Rice")
+        for i, price in enumerate(["1.00", "10.50", "999.99"]):
+            recipe = create_recipe(
+                user=self.user,
+                title=f"Recipe \u00e9 {i}",
+                price=Decimal(price),
+                link="" if i else "https://example.com",
+                image_variants={"card": f"uploads/recipe/{i}.jpg"}
+                if i
+                else {},
+            )
+            recipe.tags.add(*tags[i:])
+            if i:
+                recipe.ingredients.add(rice)
+
+    def _render_both(self, serializer_class, context):
+        recipes = Recipe.objects.filter(user=self.user).order_by("-id")
+        instances = recipes.prefetch_related(*related_prefetches(RELATIONS))
+        rows = RecipeRows(serializer_class, context)
+        renderer = JSONRenderer()
+        return (
+            renderer.render(
+                serializer_class(instances, many=True, context=context).data
+            ),
+            renderer.render(rows.to_representation(rows.values(recipes))),
+        )
+
+    def test_rows_render_like_serializers(self):
+        """Test rows render to the same bytes as the serializers."""
+        for serializer_class in [RecipeSerializer, RecipeDetailSerializer]:
+            for context in [{}, {"request": self.request}]:
+                serialized, rows = self._render_both(serializer_class, context)
+                self.assertEqual(rows, serialized)
+
+    def test_sparse_rows_render_like_serializers(self):
+        """Test rows with selected fields render like the serializer."""
+        context = {"request": self.request, "fields": {"title", "tags"}}
+        serialized, rows = self._render_both(RecipeSerializer, context)
+
+        self.assertEqual(rows, serialized)
+        self.assertNotIn(b'"id"', rows.split(b'"tags"')[0])
+
+    def test_bench_serializers(self):
+        """Test the benchmark reports both representations."""
+        out = io.StringIO()
+        call_command(
+            "bench_serializers",
+            "--recipes=5",
+            "--other-users=0",
+            "--tags=5",
+            "--ingredients=10",
+            "--runs=1",
+            "--sizes=2,5",
+            "--cleanup",
+            stdout=out,
+        )
+
+        self.assertIn("5 recipes rows", out.getvalue())
+        self.assertIn("5 recipes serializer", out.getvalue())
+
+
+class RecipeSparseFieldsetTests(TestCase):
+    """Test selecting the returned fields with ?fields= and ?expand=."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="password")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user, description="Long text")
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Rice")
+        )
+
+    def test_list_fields(self):
+        """Test listing only the selected columns without relations."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPE_URL, {"fields": "id,title"})
+
+        self.assertEqual(
+            res.data["results"],
+            [{"id": self.recipe.id, "title": self.recipe.title}],
+        )
+        # The cache version, the ETag aggregate and the recipes, no
+        # prefetches.
+        self.assertEqual(len(queries), 3)
+        self.assertNotIn("time_minutes", queries[-1]["sql"])
+
+    def test_list_expand(self):
+        """Test expanded relations are added to the other fields."""
+        res = self.client.get(RECIPE_URL, {"fields": "id", "expand": "tags"})
+
+        self.assertEqual(
+            res.data["results"],
+            [
+                {
+                    "id": self.recipe.id,
+                    "tags": [
+                        {"id": self.recipe.tags.get().id, "name": "Vegan"}
+                    ],
+                }
+            ],
+        )
+
+    def test_expand_without_fields(self):
+        """Test expand alone returns every field but the other relation."""
+        res = self.client.get(RECIPE_URL, {"expand": "ingredients"})
+
+        recipe = res.data["results"][0]
+        self.assertNotIn("tags", recipe)
+        self.assertEqual(recipe["ingredients"][0]["name"], "Rice")
+        self.assertEqual(recipe["title"], self.recipe.title)
+
+    def test_detail_fields(self):
+        """Test selecting detail fields, including the description."""
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                detail_url(self.recipe.id), {"fields": "title,description"}
+            )
+
+        self.assertEqual(
+            res.data, {"title": self.recipe.title, "description": "Long text"}
+        )
+
+    def test_unknown_fields_rejected(self):
+        """Test unknown fields and relations return a 400."""
+        res = self.client.get(
+            RECIPE_URL, {"fields": "id,user", "expand": "title"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", res.data)
+        self.assertIn("expand", res.data)
+
+    def test_full_representation_by_default(self):
+        """Test every field is returned without the parameters."""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.data, RecipeDetailSerializer(self.recipe).data)
+
+
+class RecipeBulkCreateTests(TestCase):
+    """Test creating many recipes in one request."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="password")
+        self.client.force_authenticate(self.user)
+
+    def _payload(self, count, prefix="Recipe"):
+        """Return a bulk payload of recipes sharing tags."""
+        return [
+            {
+                "title": f"{prefix} {i}",
+                "time_minutes": 10,
+                "price": "5.00",
+                "tags": [{"name": "Dinner"}, {"name": f"{prefix} tag {i}"}],
+                "ingredients": [{"name": f"{prefix} ingredient {i}"}],
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create_recipes(self):
+        """Test recipes and nested objects are created together."""
+        Tag.objects.create(user=self.user, name="Dinner")
+        payload = self._payload(3)
+
+        res = self.client.post(BULK_CREATE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipes = Recipe.objects.filter(user=self.user).order_by("id")
+        self.assertEqual(res.data, [{"id": recipe.id} for recipe in recipes])
+        self.assertEqual(
+            [recipe.title for recipe in recipes],
+            [item["title"] for item in payload],
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 4)
+        for recipe in recipes:
+            self.assertEqual(recipe.tags.count(), 2)
+            self.assertEqual(recipe.ingredients.count(), 1)
+
+    def test_bulk_create_invalid_item_creates_nothing(self):
+        """Test one invalid recipe returns per item errors."""
+        payload = self._payload(2)
+        del payload[1]["title"]
+
+        res = self.client.post(BULK_CREATE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn("title", res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    @override_settings(API_MAX_BULK_CREATE=2)
+    def test_bulk_create_limit(self):
+        """Test requests over the batch limit are rejected."""
+        res = self.client.post(
+            BULK_CREATE_URL, self._payload(3), format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_query_count_is_constant(self):
+        """Test the number of queries does not grow with the batch."""
+        counts = []
+        for count, prefix in ((2, "Small"), (20, "Large")):
+            payload = self._payload(count, prefix)
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(BULK_CREATE_URL, payload, format="json")
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+
+class RecipeExportTests(TestCase):
+    """Test streaming recipes as newline delimited JSON."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="password")
+        self.client.force_authenticate(self.user)
+
+    def _export(self):
+        """Return the exported lines parsed as JSON."""
+        res = self.client.get(EXPORT_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        content = b"".join(res.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    @override_settings(API_EXPORT_CHUNK_SIZE=2)
+    def test_export_recipes(self):
+        """Test every recipe is exported with its tags and ingredients."""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        ingredient = Ingredient.objects.create(user=self.user, name="Rice")
+        for i in range(5):
+            recipe = create_recipe(user=self.user, title=f"Recipe {i}")
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+        lines = self._export()
+
+        recipes = Recipe.objects.filter(user=self.user).order_by("-id")
+        serializer = RecipeDetailSerializer(recipes, many=True)
+        self.assertEqual(lines, json.loads(json.dumps(serializer.data)))
+
+    def test_export_limited_to_user(self):
+        """Test only the authenticated user's recipes are exported."""
+        recipe = create_recipe(user=self.user)
+        other_user = create_user(email="other@example.com", password="pass")
+        create_recipe(user=other_user)
+
+        lines = self._export()
+
+        self.assertEqual([line["id"] for line in lines], [recipe.id])
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0)
 class ImageUploadTests(TestCase):
     """Tests for image upload API."""
 
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.TemporaryDirectory()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root.name)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        cls.media_root.cleanup()
+        super().tearDownClass()
+
     def setUp(self):
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
@@ -413,6 +1332,9 @@ class ImageUploadTests(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        for name in self.recipe.image_variants.values():
+            default_storage.delete(name)
         self.recipe.image.delete()
 
     def test_upload_image(self):
@@ -438,3 +1360,320 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format="multipart")
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _upload(self, size=(10, 10)):
+        """Upload a JPEG image of the given size to the recipe."""
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+            Image.new("RGB", size).save(image_file, format="JPEG")
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post(
+                    image_upload_url(self.recipe.id),
+                    {"image": image_file},
+                    format="multipart",
+                )
+
+    def test_upload_image_generates_variants(self):
+        """Test resized variants are generated after the upload."""
+        res = self._upload(size=(2000, 1000))
+
+        self.assertEqual(res.data["image_variants"], {})
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            set(self.recipe.image_variants), {"thumbnail", "card", "full"}
+        )
+        with default_storage.open(
+            self.recipe.image_variants["thumbnail"]
+        ) as f:
+            self.assertEqual(Image.open(f).size, (150, 75))
+
+        res = self.client.get(detail_url(self.recipe.id))
+        url = res.data["image_variants"]["card"]
+        self.assertTrue(url.startswith("http://testserver/"))
+        self.assertTrue(url.endswith(".jpg"))
+
+    @override_settings(IMAGE_VARIANT_WORKERS=1)
+    def test_variants_scheduling_failure_logged(self):
+        """Test the image is saved when its variants cannot be scheduled."""
+        with patch.object(
+            images, "_get_executor", side_effect=OSError("no processes")
+        ), self.assertLogs("core.images", "ERROR"):
+            res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image)
+        self.assertEqual(self.recipe.image_variants, {})
+
+    @override_settings(IMAGE_VARIANT_WORKERS=1)
+    def test_broken_variant_pool_replaced(self):
+        """Test a pool whose worker died is replaced for the next task."""
+        broken = MagicMock()
+        broken.submit.side_effect = BrokenProcessPool()
+
+        with patch.object(images, "_executor", broken), patch.object(
+            images, "ProcessPoolExecutor"
+        ) as executor_class:
+            self._upload()
+
+        broken.shutdown.assert_called_once_with(wait=False)
+        executor_class.return_value.submit.assert_called_once()
+
+    @override_settings(IMAGE_GC_GRACE=0)
+    def test_replaced_image_variants_discarded(self):
+        """Test variants of a replaced image are not recorded."""
+        self._upload(size=(10, 10))
+        self.recipe.refresh_from_db()
+        old_name = self.recipe.image.name
+        old_variants = self.recipe.image_variants
+        names = images.render_variants(old_name)
+        self._upload(size=(20, 20))
+
+        images.save_variants(self.recipe.id, self.user.id, old_name, names)
+
+        self.recipe.refresh_from_db()
+        self.assertNotEqual(self.recipe.image_variants, old_variants)
+        for name in names.values():
+            self.assertFalse(default_storage.exists(name))
+        default_storage.delete(old_name)
+
+    def test_same_image_stored_once(self):
+        """Test identical uploads to two recipes share one file."""
+        self._upload()
+        other = create_recipe(user=self.user, title="Other")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                image_upload_url(other.id),
+                {"image": SimpleUploadedFile("copy.jpg", image_bytes())},
+                format="multipart",
+            )
+
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(other.image.name, self.recipe.image.name)
+        self.assertEqual(other.image_variants, self.recipe.image_variants)
+        stored = [name for _, name in images.iter_stored_images()]
+        self.assertEqual(
+            sorted(stored), sorted(set(images.recipe_images(self.recipe)))
+        )
+
+    @override_settings(IMAGE_GC_GRACE=0)
+    def test_replaced_image_deleted_when_unreferenced(self):
+        """Test replaced images are deleted once no recipe uses them."""
+        self._upload(size=(10, 10))
+        self.recipe.refresh_from_db()
+        old_names = images.recipe_images(self.recipe)
+        shared = create_recipe(
+            user=self.user,
+            image=self.recipe.image.name,
+            image_variants=self.recipe.image_variants,
+        )
+
+        self._upload(size=(20, 20))
+        for name in old_names:
+            self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(detail_url(shared.id))
+        for name in old_names:
+            self.assertFalse(default_storage.exists(name))
+
+    def _post_file(self, content, name="image.jpg"):
+        """Upload raw file content as the recipe image."""
+        return self.client.post(
+            image_upload_url(self.recipe.id),
+            {"image": SimpleUploadedFile(name, content)},
+            format="multipart",
+        )
+
+    def test_upload_image_not_decoded(self):
+        """Test the upload is validated without decoding the image."""
+        with patch("PIL.ImageFile.ImageFile.load") as load:
+            res = self._post_file(image_bytes())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        load.assert_not_called()
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=1000)
+    def test_upload_image_content_length_too_large(self):
+        """Test a body declared over the limit is rejected unread."""
+        res = self._post_file(b"x" * 100_000)
+
+        self.assertEqual(res.status_code, 413)
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=1000)
+    def test_upload_image_stream_too_large(self):
+        """Test streaming stops once the file goes over the limit."""
+        with patch(
+            "django.core.files.uploadhandler."
+            "TemporaryFileUploadHandler.receive_data_chunk"
+        ) as receive:
+            res = self._post_file(b"x" * 5000)
+
+        self.assertEqual(res.status_code, 413)
+        self.assertEqual(receive.call_count, 0)
+
+    def test_upload_decompression_bomb_rejected(self):
+        """Test images with huge dimensions are rejected."""
+        res = self._post_file(png_header(100_000, 100_000), "bomb.png")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("image", res.data)
+
+    @override_settings(IMAGE_MAX_PIXELS=50)
+    def test_upload_too_many_pixels_rejected(self):
+        """Test images over the pixel limit are rejected."""
+        res = self._post_file(image_bytes(size=(10, 10)))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_unsupported_format_rejected(self):
+        """Test image formats outside IMAGE_FORMATS are rejected."""
+        res = self._post_file(image_bytes(image_format="BMP"), "image.bmp")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0)
+class ChunkedImageUploadTests(TestCase):
+    """Tests for resumable chunked image uploads."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="password")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.upload_dir = tempfile.TemporaryDirectory()
+        settings_override = override_settings(
+            IMAGE_UPLOAD_DIR=self.upload_dir.name
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(self.upload_dir.cleanup)
+        self.content = image_bytes(size=(100, 100))
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        if self.recipe.image:
+            self.recipe.image.delete()
+
+    def _start(self, size=None):
+        """Start an upload and return its URL."""
+        res = self.client.post(
+            image_uploads_url(self.recipe.id),
+            {"size": size or len(self.content)},
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["offset"], 0)
+        return image_uploads_url(self.recipe.id, res.data["id"])
+
+    def _send(self, url, offset, data):
+        """Send a chunk of the upload."""
+        return self.client.patch(
+            url,
+            data,
+            content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_chunked_upload(self):
+        """Test an image sent in chunks is saved once complete."""
+        url = self._start()
+        half = len(self.content) // 2
+
+        res = self._send(url, 0, self.content[:half])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Upload-Offset"], str(half))
+
+        res = self.client.get(url)
+        self.assertEqual(res.data["offset"], half)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._send(url, half, self.content[half:])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("image", res.data)
+        self.recipe.refresh_from_db()
+        with self.recipe.image.open() as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertTrue(self.recipe.image.name.endswith(".jpg"))
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertEqual(os.listdir(self.upload_dir.name), [])
+        for name in self.recipe.image_variants.values():
+            default_storage.delete(name)
+
+    def test_chunk_received_before_lock(self):
+        """Test the upload is only locked once its chunk is received."""
+        url = self._start()
+        receive_chunk = uploads.receive_chunk
+        locked = []
+
+        def receive(*args):
+            locked.append(any("FOR UPDATE" in q["sql"] for q in queries))
+            return receive_chunk(*args)
+
+        with CaptureQueriesContext(connection) as queries, patch.object(
+            uploads, "receive_chunk", side_effect=receive
+        ):
+            res = self._send(url, 0, self.content[:10])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(locked, [False])
+        self.assertTrue(any("FOR UPDATE" in q["sql"] for q in queries))
+
+    def test_resume_at_wrong_offset(self):
+        """Test a chunk not starting at the current offset is refused."""
+        url = self._start()
+        self._send(url, 0, self.content[:10])
+
+        res = self._send(url, 5, self.content[5:20])
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data["offset"], 10)
+
+    def test_chunk_past_size_rejected(self):
+        """Test chunks going past the declared size are discarded."""
+        url = self._start(size=10)
+
+        res = self._send(url, 0, self.content[:20])
+
+        self.assertEqual(res.status_code, 413)
+        self.assertEqual(self.client.get(url).data["offset"], 0)
+
+    def test_missing_offset_rejected(self):
+        """Test chunks need an Upload-Offset header."""
+        url = self._start()
+
+        res = self.client.patch(
+            url, b"x", content_type="application/offset+octet-stream"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=100)
+    def test_upload_size_over_limit_rejected(self):
+        """Test uploads larger than the limit cannot be started."""
+        res = self.client.post(
+            image_uploads_url(self.recipe.id), {"size": 101}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_image_rejected_when_complete(self):
+        """Test a completed upload that is not an image is discarded."""
+        url = self._start(size=4)
+
+        res = self._send(url, 0, b"junk")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_other_users_upload_not_found(self):
+        """Test uploads are only reachable through the owner's recipes."""
+        url = self._start()
+        other = create_user(email="other@example.com", password="password")
+        self.client.force_authenticate(other)
+
+        res = self._send(url, 0, self.content)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
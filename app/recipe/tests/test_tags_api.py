@@ -5,8 +5,10 @@ Tests for the tags API.
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -17,6 +19,7 @@ from recipe.serializers import TagSerializer
 
 
 TAGS_URL = reverse("recipe:tag-list")
+TAGS_AUTOCOMPLETE_URL = reverse("recipe:tag-autocomplete")
 
 
 def detail_url(tag_id):
@@ -69,7 +72,7 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test tags displayed are only asociated with user"""
@@ -89,11 +92,12 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
-        self.assertEqual(res.data[0]["name"], serializer.data[0]["name"])
-        self.assertEqual(res.data[0]["id"], serializer.data[0]["id"])
+        self.assertEqual(len(res.data["results"]), 2)
+        results = res.data["results"]
+        self.assertEqual(results[0]["name"], serializer.data[0]["name"])
+        self.assertEqual(results[0]["id"], serializer.data[0]["id"])
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_update_tag(self):
         """Test updating a tag."""
@@ -107,6 +111,18 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload["name"])
 
+    def test_update_tag_duplicate_name_error(self):
+        """Test renaming a tag to an existing name returns an error."""
+        create_tag(user=self.user, name="Dessert")
+        tag = create_tag(user=self.user, name="After Dinner")
+
+        payload = {"name": "Dessert"}
+        res = self.client.patch(detail_url(tag.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "After Dinner")
+
     def test_delete_tag(self):
         """Test Deleting a tag."""
         tag = Tag.objects.create(user=self.user, name="Diego")
@@ -133,8 +149,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
         serializer_1 = TagSerializer(tag_1)
         serializer_2 = TagSerializer(tag_2)
-        self.assertIn(serializer_1.data, res.data)
-        self.assertNotIn(serializer_2.data, res.data)
+        self.assertIn(serializer_1.data, res.data["results"])
+        self.assertNotIn(serializer_2.data, res.data["results"])
 
     def test_filtered_tags_unique(self):
         """Test filtered tags return a unique list."""
@@ -156,4 +172,208 @@ class PrivateTagsApiTests(TestCase):
         reicpe_2.tags.add(tag)
 
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_assigned_only_uses_semi_join(self):
+        """Test assigned tags are found without joining every recipe."""
+        tag = create_tag(user=self.user)
+        recipe = Recipe.objects.create(
+            title="Sushi",
+            time_minutes=5,
+            price=Decimal("4.40"),
+            user=self.user,
+        )
+        recipe.tags.add(tag)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual(len(res.data["results"]), 1)
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertIn("EXISTS", sql)
+        self.assertNotIn("DISTINCT", sql)
+
+    def test_tags_with_counts(self):
+        """Test listing tags with the number of recipes using them."""
+        tag_1 = create_tag(user=self.user, name="Breakfast")
+        tag_2 = create_tag(user=self.user, name="Lunch")
+        for title in ["Eggs", "Toast"]:
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=Decimal("1.00"),
+                user=self.user,
+            )
+            recipe.tags.add(tag_1)
+
+        res = self.client.get(TAGS_URL, {"with_counts": 1})
+
+        self.assertEqual(
+            res.data["results"],
+            [
+                {"id": tag_2.id, "name": "Lunch", "recipe_count": 0},
+                {"id": tag_1.id, "name": "Breakfast", "recipe_count": 2},
+            ],
+        )
+
+    def test_tags_without_counts(self):
+        """Test recipe counts are only returned when requested."""
+        create_tag(user=self.user)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn("recipe_count", res.data["results"][0])
+
+    def test_tags_ordered_by_popularity(self):
+        """Test tags are paginated most used first."""
+        tags = [create_tag(user=self.user, name=name) for name in "ABC"]
+        for count, tag in enumerate(tags):
+            for n in range(count):
+                recipe = Recipe.objects.create(
+                    title=f"Recipe {n}",
+                    time_minutes=5,
+                    price=Decimal("1.00"),
+                    user=self.user,
+                )
+                recipe.tags.add(tag)
+
+        res = self.client.get(
+            TAGS_URL, {"ordering": "popular", "page_size": 2}
+        )
+
+        self.assertEqual(
+            [(t["name"], t["recipe_count"]) for t in res.data["results"]],
+            [("C", 2), ("B", 1)],
+        )
+        res = self.client.get(res.data["next"])
+        self.assertEqual([t["name"] for t in res.data["results"]], ["A"])
+
+    def test_popular_tags_with_equal_counts_paginated(self):
+        """Test tags used equally often are each returned once."""
+        for name in "ABCDE":
+            create_tag(user=self.user, name=name)
+
+        res = self.client.get(
+            TAGS_URL, {"ordering": "popular", "page_size": 2}
+        )
+        names = [t["name"] for t in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            names += [t["name"] for t in res.data["results"]]
+
+        self.assertEqual(names, ["E", "D", "C", "B", "A"])
+
+    def test_tags_ordered_by_name(self):
+        """Test tags are paginated by ascending name when asked."""
+        for name in "CAB":
+            create_tag(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {"ordering": "name", "page_size": 2})
+
+        self.assertEqual([t["name"] for t in res.data["results"]], ["A", "B"])
+        res = self.client.get(res.data["next"])
+        self.assertEqual([t["name"] for t in res.data["results"]], ["C"])
+
+    def test_invalid_list_params_rejected(self):
+        """Test unparsable list parameters return 400 errors."""
+        create_tag(user=self.user)
+        params = [
+            {"with_counts": "maybe"},
+            {"assigned_only": "x"},
+            {"ordering": "id"},
+        ]
+        for param in params:
+            res = self.client.get(TAGS_URL, param)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(param)), res.data)
+
+        res = self.client.get(TAGS_URL, {"with_counts": "true"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("recipe_count", res.data["results"][0])
+
+    def test_autocomplete_tags(self):
+        """Test tags are completed by prefix, most used first."""
+        create_tag(user=self.user, name="Brunch")
+        breakfast = create_tag(user=self.user, name="breakfast")
+        create_tag(user=self.user, name="Lunch")
+        create_tag(user=create_user("other@example.com"), name="Bread")
+        recipe = Recipe.objects.create(
+            title="Eggs", time_minutes=5, price=Decimal("1.00"), user=self.user
+        )
+        recipe.tags.add(breakfast)
+
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {"prefix": "BR"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(t["name"], t["recipe_count"]) for t in res.data],
+            [("breakfast", 1), ("Brunch", 0)],
+        )
+
+    def test_autocomplete_limit(self):
+        """Test autocomplete returns at most limit tags."""
+        for name in ["Bread", "Breakfast", "Brunch"]:
+            create_tag(user=self.user, name=name)
+
+        res = self.client.get(
+            TAGS_AUTOCOMPLETE_URL, {"prefix": "b", "limit": 2}
+        )
+
+        self.assertEqual([t["name"] for t in res.data], ["Bread", "Breakfast"])
+
+    def test_autocomplete_prefix_matched_literally(self):
+        """Test LIKE wildcards in the prefix match only themselves."""
+        create_tag(user=self.user, name="100% rye")
+        create_tag(user=self.user, name="1000 island")
+
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {"prefix": "100%"})
+
+        self.assertEqual([t["name"] for t in res.data], ["100% rye"])
+
+    def test_autocomplete_invalid_query(self):
+        """Test a missing prefix or too large limit is rejected."""
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("prefix", res.data)
+
+        res = self.client.get(
+            TAGS_AUTOCOMPLETE_URL, {"prefix": "a", "limit": 1000}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("limit", res.data)
+
+    def test_tags_paginated(self):
+        """Test tags are returned in pages linked by cursors."""
+        for name in ["A", "B", "C"]:
+            create_tag(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {"page_size": 2})
+
+        self.assertEqual([t["name"] for t in res.data["results"]], ["C", "B"])
+        res = self.client.get(res.data["next"])
+        self.assertEqual([t["name"] for t in res.data["results"]], ["A"])
+        self.assertIsNone(res.data["next"])
+
+    def test_tag_list_cache_invalidated_on_update(self):
+        """Test renaming a tag refreshes the cached tag list."""
+        tag = create_tag(user=self.user, name="Breakfast")
+        self.client.get(TAGS_URL)
+
+        self.client.patch(detail_url(tag.id), {"name": "Brunch"})
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"][0]["name"], "Brunch")
+
+    def test_failed_update_keeps_cache(self):
+        """Test a rolled back rename leaves the cached tag list valid."""
+        tag = create_tag(user=self.user, name="Breakfast")
+        create_tag(user=self.user, name="Brunch")
+        self.client.get(TAGS_URL)
+
+        res = self.client.patch(detail_url(tag.id), {"name": "Brunch"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res["X-Cache"], "HIT")
@@ -2,8 +2,11 @@
 URL mappings for the recipe app.
 """
 
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+
+from core.async_views import as_async_urlpatterns
 from recipe import views
 
 
@@ -14,4 +17,8 @@ router.register("ingredient", views.IngredientViewSet)
 
 app_name = "recipe"
 
-urlpatterns = [path("", include(router.urls))]
+urls = router.urls
+if settings.API_ASYNC_VIEWS:
+    urls = as_async_urlpatterns(urls)
+
+urlpatterns = [path("", include(urls))]
@@ -1,6 +1,9 @@
 """
 Views for the recipe APIs.
 """
+import hashlib
+import json
+from io import BytesIO
 
 from drf_spectacular.utils import (
     extend_schema_view,
@@ -8,16 +11,171 @@ from drf_spectacular.utils import (
     OpenApiParameter,
     OpenApiTypes,
 )
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.functional import cached_property
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.translation import gettext as _, gettext_lazy
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import ImageUpload, Recipe, Tag, Ingredient
 from recipe import serializers
+from core import cache, images, search, uploads
+from core.routers import ReplicaReadsMixin
+from recipe.filters import MATCH_ANY, filter_by_related, search_recipes
+from user.authentication import SignedTokenAuthentication
+from recipe.representations import (
+    RELATIONS,
+    RecipeRows,
+    related_prefetches,
+)
+from recipe.pagination import (
+    POPULAR_ORDERING,
+    RecipeCursorPagination,
+    RecipeAttrCursorPagination,
+)
+
+
+VALIDATOR_HEADERS = ["ETag", "Last-Modified"]
+SPARSE_FIELDSET_ACTIONS = ("list", "retrieve", "search")
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        OpenApiTypes.STR,
+        description=(
+            "Comma separated list of the fields to return, tags and "
+            "ingredients are only returned when listed here or in expand."
+        ),
+    ),
+    OpenApiParameter(
+        "expand",
+        OpenApiTypes.STR,
+        description="Comma separated list of the relations to return.",
+    ),
+]
+UUID_PATTERN = "[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+
+
+class PayloadTooLarge(APIException):
+    """Raised when an upload is over the size limit."""
+
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = gettext_lazy("Upload is too large.")
+    default_code = "payload_too_large"
+
+
+class CachedListMixin:
+    """Serve list responses from the per-user versioned cache."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """Serve the request from the cache, caching handler's response."""
+        key = cache.response_key(
+            request.user.id,
+            f"{request.build_absolute_uri()} {request.accepted_media_type}",
+        )
+        cached = cache.get_response(key)
+        if cached is not None:
+            data, headers = cached
+            response = Response(data, headers={**headers, "X-Cache": "HIT"})
+            return get_conditional_response(
+                request,
+                etag=headers.get("ETag"),
+                last_modified=parse_http_date_safe(
+                    headers.get("Last-Modified")
+                ),
+                response=response,
+            )
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            headers = {
+                h: response[h] for h in VALIDATOR_HEADERS if h in response
+            }
+            cache.set_response(key, (response.data, headers))
+        response["X-Cache"] = "MISS"
+        return response
+
+
+class ConditionalGetMixin:
+    """Answer conditional list and detail requests with 304 responses.
+
+    Views implement ``get_freshness`` to return the ETag and the last
+    modification time of the requested data without serializing it.
+    """
+
+    def get_freshness(self):
+        """Return ``(etag, last_modified)``, or None to skip the check."""
+        raise NotImplementedError
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        freshness = self.get_freshness()
+        if freshness is None:
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = freshness
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (
+            status.HTTP_200_OK,
+            status.HTTP_304_NOT_MODIFIED,
+        ):
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+
+class RowsListMixin:
+    """List with the representation returned by ``get_rows``.
+
+    The rows are built from ``values()`` of the page, which is much
+    faster than serializing model instances field by field.
+    """
+
+    def get_rows(self):
+        """Return the representation of the listed objects."""
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        return self.list_rows()
+
+    def list_rows(self):
+        """Return the paginated response of the filtered queryset."""
+        rows = self.get_rows()
+        queryset = rows.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(rows.to_representation(queryset))
+        return self.get_paginated_response(rows.to_representation(page))
 
 
 @extend_schema_view(
@@ -33,41 +191,174 @@ from recipe import serializers
                 OpenApiTypes.STR,
                 description="Comma separated list of ingredient ids to filter",
             ),
+            OpenApiParameter(
+                "match",
+                OpenApiTypes.STR,
+                enum=["any", "all"],
+                description=(
+                    "Return recipes with any (default) or all of the tags "
+                    "and ingredients filtered by."
+                ),
+            ),
+            OpenApiParameter(
+                "search",
+                OpenApiTypes.STR,
+                description=(
+                    "Full text search over titles, descriptions, tags and "
+                    "ingredients, ordered by relevance."
+                ),
+            ),
+            *SPARSE_FIELDSET_PARAMETERS,
         ]
-    )
+    ),
+    retrieve=extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    ReplicaReadsMixin,
+    CachedListMixin,
+    ConditionalGetMixin,
+    RowsListMixin,
+    viewsets.ModelViewSet,
+):
     """View for manage recipe APIs."""
 
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [SignedTokenAuthentication, TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+    read_actions = ("search",)
 
-    def _params_to_ints(self, query_string):
-        """Convert a list of strings to integers."""
-        return [int(str_id) for str_id in query_string.split(",")]
+    def _params_to_list(self, query_string):
+        """Convert a comma separated string to a list."""
+        return query_string.split(",") if query_string else []
+
+    def _get_filters(self):
+        """Return the validated tag and ingredient filters."""
+        if self.action == "search":
+            data = self.request.data
+        else:
+            params = self.request.query_params
+            data = {
+                "tags": self._params_to_list(params.get("tags")),
+                "ingredients": self._params_to_list(params.get("ingredients")),
+                "match": params.get("match", MATCH_ANY),
+                "search": params.get("search", ""),
+            }
+        serializer = serializers.RecipeSearchSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
 
     def get_queryset(self):
         """Retrieve recipes for autheticated user."""
-        tags = self.request.query_params.get("tags")
-        ingredients = self.request.query_params.get("ingredients")
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+        filters = self._get_filters()
+        queryset = filter_by_related(
+            self.queryset,
+            {
+                "tags": filters.get("tags"),
+                "ingredients": filters.get("ingredients"),
+            },
+            filters["match"],
+        )
+        if filters.get("search"):
+            queryset = search_recipes(queryset, filters["search"])
+
+        queryset = queryset.filter(user=self.request.user).order_by("-id")
+        fields = self.requested_fields
+        if fields is None:
+            return queryset.defer("search_vector").prefetch_related(
+                *related_prefetches(RELATIONS)
+            )
+        return queryset.only(
+            *(name for name in fields if name not in RELATIONS)
+        ).prefetch_related(
+            *related_prefetches(name for name in RELATIONS if name in fields)
+        )
 
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+    @cached_property
+    def requested_fields(self):
+        """Return the fields selected by ?fields= and ?expand=.
 
-        return queryset.filter(user=self.request.user).order_by("-id")
+        None selects every field. Once either parameter is given tags and
+        ingredients are only returned if named, the other fields unless
+        ?fields= leaves them out.
+        """
+        params = self.request.query_params
+        if self.action not in SPARSE_FIELDSET_ACTIONS or not (
+            "fields" in params or "expand" in params
+        ):
+            return None
+
+        available = self.get_serializer_class().Meta.fields
+        if "fields" in params:
+            fields = set(self._params_to_list(params["fields"]))
+        else:
+            fields = set(available) - set(RELATIONS)
+        expand = set(self._params_to_list(params.get("expand")))
+
+        errors = {}
+        unknown = fields - set(available)
+        if unknown or not fields | expand:
+            errors["fields"] = [
+                _("Select fields among: %(fields)s.")
+                % {"fields": ", ".join(available)}
+            ]
+        if expand - set(RELATIONS):
+            errors["expand"] = [
+                _("Select relations among: %(fields)s.")
+                % {"fields": ", ".join(RELATIONS)}
+            ]
+        if errors:
+            raise ValidationError(errors)
+        return fields | expand
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"] = self.requested_fields
+        return context
+
+    def get_freshness(self):
+        """Return the ETag and last modification of the requested recipes.
+
+        Computed from the number of recipes and their latest
+        ``updated_at``, so deletions change the ETag as well. Lists only
+        get the ETag, deleting a recipe does not move their latest
+        ``updated_at``.
+        """
+        recipes = Recipe.objects.filter(user=self.request.user)
+        if self.action == "retrieve":
+            try:
+                recipes = recipes.filter(pk=int(self.kwargs["pk"]))
+            except ValueError:
+                return None
+
+        state = recipes.aggregate(
+            count=Count("id"), last_modified=Max("updated_at")
+        )
+        if self.action == "retrieve" and not state["count"]:
+            return None
+
+        last_modified = state["last_modified"]
+        version = "|".join(
+            [
+                self.request.build_absolute_uri(),
+                self.request.accepted_media_type,
+                str(state["count"]),
+                last_modified.isoformat() if last_modified else "",
+            ]
+        )
+        etag = hashlib.sha1(version.encode()).hexdigest()
+        if self.action != "retrieve":
+            last_modified = None
+        return quote_etag(etag), last_modified
 
     def get_serializer_class(self):
-        if self.action == "list":
+        if self.action in ("list", "search"):
             return serializers.RecipeSerializer
-        elif self.action == "upload_image":
+        elif self.action in ("upload_image", "image_upload"):
             return serializers.RecipeImageSerializer
+        elif self.action == "image_uploads":
+            return serializers.ImageUploadSerializer
 
         return self.serializer_class
 
@@ -75,55 +366,326 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create new Recipe for user"""
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        """Delete the recipe and invalidate cached responses."""
+        stored_images = images.recipe_images(instance)
+        instance.delete()
+        images.release_on_commit(stored_images)
+        cache.bump_version(self.request.user.id)
+
+    @extend_schema(
+        request=serializers.RecipeDetailSerializer(many=True),
+        responses=serializers.RecipeBulkCreateResultSerializer(many=True),
+    )
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="bulk-create",
+        pagination_class=None,
+    )
+    def bulk_create(self, request):
+        """Create many recipes in a single transaction."""
+        serializer = self.get_serializer(data=request.data, many=True)
+
+        if serializer.is_valid():
+            recipes = serializer.save(user=self.request.user)
+            data = [{"id": recipe.id} for recipe in recipes]
+            return Response(data, status=status.HTTP_201_CREATED)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(
+        request=serializers.RecipeSearchSerializer,
+        responses=serializers.RecipeSerializer(many=True),
+    )
+    @action(methods=["POST"], detail=False)
+    def search(self, request):
+        """List recipes filtered by the ids in the request body.
+
+        Accepts the same filters as the list as JSON, for id lists too
+        long for a query string. Follow the returned cursors by posting
+        the same body to them.
+        """
+        return self.list_rows()
+
+    def get_rows(self):
+        return RecipeRows(
+            self.get_serializer_class(), self.get_serializer_context()
+        )
+
+    def _export_lines(self, queryset):
+        """Yield recipes as JSON lines, reading them in fixed size chunks.
+
+        Each chunk is its own query after the last id read, so no cursor
+        stays open between chunks and ASGI can read them on any thread.
+        """
+        rows = RecipeRows(serializers.RecipeDetailSerializer, {})
+        chunk_size = settings.API_EXPORT_CHUNK_SIZE
+        values = rows.values(queryset.order_by("-id"))
+        chunk = list(values[:chunk_size])
+        while chunk:
+            yield self._serialize_lines(rows, chunk)
+            if len(chunk) < chunk_size:
+                break
+            chunk = list(values.filter(id__lt=chunk[-1]["id"])[:chunk_size])
+
+    def _serialize_lines(self, rows, chunk):
+        """Serialize a chunk of recipe rows to JSON lines."""
+        return "".join(
+            json.dumps(data, cls=JSONEncoder) + "\n"
+            for data in rows.to_representation(chunk)
+        )
+
+    @extend_schema(responses={(200, "application/x-ndjson"): OpenApiTypes.STR})
+    @action(methods=["GET"], detail=False, pagination_class=None)
+    def export(self, request):
+        """Stream all recipes as newline delimited JSON."""
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            self._export_lines(queryset),
+            content_type="application/x-ndjson",
+        )
+        response[
+            "Content-Disposition"
+        ] = 'attachment; filename="recipes.ndjson"'
+        return response
+
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
         """Upload an image to recipe."""
         recipe = self.get_object()
+        # Stream the file to disk and stop reading past the size limit.
+        try:
+            handler = uploads.limit_upload(
+                request._request, settings.IMAGE_UPLOAD_MAX_BYTES
+            )
+        except uploads.UploadTooLarge:
+            raise PayloadTooLarge()
         serializer = self.get_serializer(recipe, data=request.data)
+        if handler.exceeded:
+            raise PayloadTooLarge()
+
+        return self._save_image(serializer)
 
+    def _save_image(self, serializer):
+        """Save a validated image and generate its variants."""
         if serializer.is_valid():
-            serializer.save()
+            replaced = images.recipe_images(serializer.instance)
+            # Variants are generated once the new image is committed.
+            recipe = serializer.save(image_variants={})
+            transaction.on_commit(lambda: images.generate_variants(recipe))
+            images.release_on_commit(replaced)
+            cache.bump_version(recipe.user_id)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=["POST"], detail=True, url_path="image-uploads")
+    def image_uploads(self, request, pk=None):
+        """Start a resumable image upload sent in chunks."""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        uploads.delete_expired()
+        serializer.save(recipe=recipe)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-@extend_schema_view(
-    list=extend_schema(
+    @extend_schema(
+        methods=["GET"],
         parameters=[
             OpenApiParameter(
-                "assigned_only",
-                OpenApiTypes.INT,
-                enum=[0, 1],
-                description="Filter by items assigned to recipes.",
+                "upload_id", OpenApiTypes.UUID, OpenApiParameter.PATH
             )
-        ]
+        ],
+        responses=serializers.ImageUploadSerializer,
+    )
+    @extend_schema(
+        methods=["PATCH"],
+        request={"application/offset+octet-stream": bytes},
+        parameters=[
+            OpenApiParameter(
+                "upload_id", OpenApiTypes.UUID, OpenApiParameter.PATH
+            ),
+            OpenApiParameter(
+                "Upload-Offset",
+                OpenApiTypes.INT,
+                location=OpenApiParameter.HEADER,
+                description="Offset of the chunk in the image.",
+            ),
+        ],
+        responses=serializers.ImageUploadSerializer,
     )
+    @action(
+        methods=["GET", "PATCH"],
+        detail=True,
+        url_path=rf"image-uploads/(?P<upload_id>{UUID_PATTERN})",
+    )
+    def image_upload(self, request, pk=None, upload_id=None):
+        """Report or continue a chunked image upload.
+
+        PATCH appends the raw request body at the ``Upload-Offset`` header,
+        the recipe image is saved once the last byte is received.
+        """
+        recipe = self.get_object()
+        upload = get_object_or_404(ImageUpload, pk=upload_id, recipe=recipe)
+        if request.method == "GET":
+            return self._upload_progress(upload, uploads.get_offset(upload))
+
+        try:
+            offset = int(request.headers["Upload-Offset"])
+        except (KeyError, ValueError):
+            msg = _("A numeric Upload-Offset header is required.")
+            raise ValidationError({"Upload-Offset": [msg]})
+
+        try:
+            spool = uploads.receive_chunk(
+                upload, request.stream or BytesIO(), offset
+            )
+            with spool, transaction.atomic():
+                # Locking the upload serializes concurrent chunks.
+                upload = get_object_or_404(
+                    ImageUpload.objects.select_for_update(), pk=upload.pk
+                )
+                offset = uploads.append_chunk(upload, spool, offset)
+        except uploads.OffsetMismatch as e:
+            response = self._upload_progress(upload, e.offset)
+            response.status_code = status.HTTP_409_CONFLICT
+            return response
+        except uploads.UploadTooLarge:
+            raise PayloadTooLarge()
+
+        if offset < upload.size:
+            return self._upload_progress(upload, offset)
+        return self._finish_upload(recipe, upload)
+
+    def _upload_progress(self, upload, offset):
+        """Return the state of a chunked upload."""
+        data = {"id": upload.id, "size": upload.size, "offset": offset}
+        return Response(data, headers={"Upload-Offset": str(offset)})
+
+    def _finish_upload(self, recipe, upload):
+        """Save the image of a completed chunked upload."""
+        with open(uploads.partial_path(upload), "rb") as f:
+            try:
+                image_format, _size = images.check_image_header(f)
+            except DjangoValidationError as e:
+                uploads.delete_upload(upload)
+                return Response(
+                    {"image": e.messages}, status=status.HTTP_400_BAD_REQUEST
+                )
+            name = f"{upload.id}{images.image_extension(image_format)}"
+            serializer = self.get_serializer(
+                recipe, data={"image": File(f, name=name)}
+            )
+            response = self._save_image(serializer)
+        uploads.delete_upload(upload)
+        return response
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=[serializers.RecipeAttrQuerySerializer])
 )
 class BaseRecipeAtrrViewSet(
+    ReplicaReadsMixin,
+    CachedListMixin,
     mixins.DestroyModelMixin,
     mixins.ListModelMixin,
     mixins.UpdateModelMixin,
     viewsets.GenericViewSet,
 ):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [SignedTokenAuthentication, TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeAttrCursorPagination
 
     def get_queryset(self):
         """Filter queryset for authenticated users"""
-        assigned_only = bool(
-            int(self.request.query_params.get("assigned_only", 0))
+        query = serializers.RecipeAttrQuerySerializer(
+            data=self.request.query_params
+        )
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        with_counts = (
+            params["with_counts"] or params.get("ordering") == POPULAR_ORDERING
         )
 
-        queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+        queryset = self.queryset.filter(user=self.request.user)
+        if params["assigned_only"]:
+            # A semi-join stops at the first recipe link of each item
+            # instead of joining all of them and removing the duplicates.
+            queryset = queryset.filter(Exists(self._item_links()))
+        if with_counts:
+            queryset = queryset.annotate(recipe_count=Count("recipe"))
+
+        return queryset.order_by("-name")
+
+    def _item_links(self):
+        """Return the recipe links of the item of the outer query."""
+        return self.recipe_links.objects.filter(
+            **{self.queryset.model._meta.model_name: OuterRef("pk")}
+        )
+
+    def perform_update(self, serializer):
+        """Update the item, rejecting names the user already has."""
+        try:
+            with transaction.atomic():
+                item = serializer.save()
+                item.recipe_set.update(updated_at=timezone.now())
+                search.update_search_vectors(item.recipe_set.values("id"))
+                cache.bump_version(self.request.user.id)
+        except IntegrityError:
+            msg = _("An item with this name already exists.")
+            raise ValidationError({"name": [msg]})
+
+    @extend_schema(
+        parameters=[serializers.AutocompleteQuerySerializer],
+        responses=serializers.TagSerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False, pagination_class=None)
+    def autocomplete(self, request):
+        """List the most used items whose name starts with a prefix.
+
+        Names are matched case insensitively using an index on
+        ``(user_id, UPPER(name))``, ties are ordered by name.
+        """
+        return self.cached_response(self._autocomplete, request)
+
+    def _autocomplete(self, request):
+        query = serializers.AutocompleteQuerySerializer(
+            data=request.query_params
+        )
+        query.is_valid(raise_exception=True)
+        # Counting per matching item reads the (item, recipe) index rather
+        # than grouping the links of every item of every user.
+        recipe_count = (
+            self._item_links()
+            .order_by()
+            .values(self.queryset.model._meta.model_name)
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        queryset = (
+            self.queryset.filter(
+                user=request.user,
+                name__istartswith=query.validated_data["prefix"],
+            )
+            .annotate(recipe_count=Coalesce(Subquery(recipe_count), 0))
+            .order_by("-recipe_count", "name")
+        )
+        serializer = self.get_serializer(
+            queryset[: query.validated_data["limit"]], many=True
+        )
+        return Response(serializer.data)
 
-        return (
-            queryset.filter(user=self.request.user)
-            .order_by("-name")
-            .distinct()
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Delete the item and reindex the recipes that used it."""
+        recipe_ids = list(instance.recipe_set.values_list("id", flat=True))
+        instance.delete()
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            updated_at=timezone.now()
         )
+        search.update_search_vectors(recipe_ids)
+        cache.bump_version(self.request.user.id)
 
 
 class TagViewSet(BaseRecipeAtrrViewSet):
@@ -131,9 +693,11 @@ class TagViewSet(BaseRecipeAtrrViewSet):
 
     serializer_class = serializers.TagSerializer
     queryset = Tag.objects.all()
+    recipe_links = Recipe.tags.through
 
 
 class IngredientViewSet(BaseRecipeAtrrViewSet):
     "Manage ingredients in the data base"
     serializer_class = serializers.TagSerializer
     queryset = Ingredient.objects.all()
+    recipe_links = Recipe.ingredients.through
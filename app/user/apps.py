@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        # Registers the schema extensions.
+        from user import schema  # noqa: F401
+        # Connects the revocation of inactive and deleted users' tokens.
+        from user import signals  # noqa: F401
@@ -0,0 +1,175 @@
+"""
+Stateless signed token authentication.
+
+Signed tokens carry the user id, a token id and the expiry, signed with
+the SECRET_KEY, so they are verified without reading the database.
+Revoked token ids, and the users whose tokens are all revoked once they
+are deactivated or deleted, are stored in the database and every worker
+keeps an in-memory copy reloaded at most every AUTH_DENYLIST_SYNC_INTERVAL
+seconds.
+"""
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.utils import timezone
+from django.utils.translation import gettext as _
+from rest_framework import authentication, exceptions
+
+from core.models import RevokedToken, RevokedUser
+
+SIGNED_TOKEN_SALT = "user.signed-token"
+
+
+class SignedToken:
+    """Verified contents of a signed token."""
+
+    def __init__(self, user_id, token_id, issued, expires):
+        self.user_id = user_id
+        self.token_id = token_id
+        self.issued = issued
+        self.expires = expires
+
+
+class Denylist:
+    """In-memory copy of the revoked tokens and users of all workers."""
+
+    def __init__(self):
+        self._expires = {}
+        self._users = {}
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, token):
+        if self._is_stale():
+            self.sync()
+        if token.token_id in self._expires:
+            return True
+        revoked_at = self._users.get(token.user_id)
+        return revoked_at is not None and token.issued <= revoked_at
+
+    def _is_stale(self):
+        return (
+            self._synced_at is None
+            or time.monotonic() - self._synced_at
+            >= settings.AUTH_DENYLIST_SYNC_INTERVAL
+        )
+
+    def sync(self):
+        """Reload the tokens and users revoked and not yet expired."""
+        now = timezone.now()
+        with self._lock:
+            self._expires = dict(
+                RevokedToken.objects.filter(expires_at__gt=now).values_list(
+                    "token_id", "expires_at"
+                )
+            )
+            self._users = dict(
+                RevokedUser.objects.filter(expires_at__gt=now).values_list(
+                    "user_id", "revoked_at"
+                )
+            )
+            self._synced_at = time.monotonic()
+
+    def add(self, token_id, expires):
+        """Deny a token in this worker until the next reload."""
+        with self._lock:
+            self._expires[token_id] = expires
+
+    def add_user(self, user_id, revoked_at):
+        """Deny the user's tokens in this worker until the next reload."""
+        with self._lock:
+            self._users[user_id] = revoked_at
+
+
+denylist = Denylist()
+
+
+def _signer():
+    return signing.Signer(salt=SIGNED_TOKEN_SALT)
+
+
+def issue_token(user):
+    """Return a new signed token for the user and its expiry."""
+    issued = int(time.time())
+    expires = issued + settings.AUTH_SIGNED_TOKEN_MAX_AGE
+    token = _signer().sign_object(
+        {
+            "u": user.pk,
+            "j": secrets.token_urlsafe(12),
+            "i": issued,
+            "e": expires,
+        }
+    )
+    return token, datetime.fromtimestamp(expires, tz=dt_timezone.utc)
+
+
+def revoke_token(token):
+    """Deny a signed token in every worker until it expires."""
+    RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    RevokedToken.objects.get_or_create(
+        token_id=token.token_id, defaults={"expires_at": token.expires}
+    )
+    denylist.add(token.token_id, token.expires)
+
+
+def revoke_user_tokens(user_id):
+    """Deny every signed token issued to the user so far."""
+    now = timezone.now()
+    # Tokens have the second of their issue, the ones issued within the
+    # current second are revoked too.
+    revoked_at = now.replace(microsecond=0)
+    RevokedUser.objects.filter(expires_at__lte=now).delete()
+    RevokedUser.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            "revoked_at": revoked_at,
+            "expires_at": revoked_at
+            + timedelta(seconds=settings.AUTH_SIGNED_TOKEN_MAX_AGE),
+        },
+    )
+    denylist.add_user(user_id, revoked_at)
+
+
+class SignedTokenAuthentication(authentication.BaseAuthentication):
+    """Authenticate requests with a signed ``Bearer`` token.
+
+    The user is not loaded, ``request.user`` is an unsaved instance with
+    only its primary key set and views needing the other fields must
+    load them. Tokens of users deactivated or deleted since their issue
+    are denied like revoked tokens.
+    """
+
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_("Invalid token header."))
+
+        try:
+            payload = _signer().unsign_object(auth[1].decode())
+            token = SignedToken(
+                payload["u"],
+                payload["j"],
+                datetime.fromtimestamp(payload["i"], tz=dt_timezone.utc),
+                datetime.fromtimestamp(payload["e"], tz=dt_timezone.utc),
+            )
+        except (signing.BadSignature, UnicodeError, KeyError, TypeError):
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        if token.expires <= timezone.now():
+            raise exceptions.AuthenticationFailed(_("Token has expired."))
+        if token in denylist:
+            raise exceptions.AuthenticationFailed(_("Token has been revoked."))
+
+        return get_user_model()(pk=token.user_id), token
+
+    def authenticate_header(self, request):
+        return self.keyword
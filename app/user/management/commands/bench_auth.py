@@ -0,0 +1,81 @@
+"""
+Django command for benchmarking the authentication schemes.
+"""
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core import benchmarks
+from user.authentication import issue_token
+
+
+class Command(BaseCommand):
+    """Django command to compare DB tokens and signed tokens"""
+
+    help = (
+        "Time authenticated API requests using database tokens and signed "
+        "tokens, and count the queries each request runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--runs", type=int, default=500, help="Timed runs per scheme."
+        )
+        parser.add_argument(
+            "--url",
+            default=reverse("recipe:tag-list"),
+            help="Authenticated URL requested.",
+        )
+        parser.add_argument(
+            "--host", default="localhost", help="Host header of requests."
+        )
+
+    def handle(self, *args, **options):
+        """Entry point from command"""
+        user, _ = get_user_model().objects.get_or_create(
+            email=benchmarks.BENCH_EMAIL.format("auth")
+        )
+        db_token, _ = Token.objects.get_or_create(user=user)
+        signed_token, _ = issue_token(user)
+        schemes = {
+            "db token": f"Token {db_token.key}",
+            "signed token": f"Bearer {signed_token}",
+        }
+
+        self.client = Client(HTTP_HOST=options["host"])
+        for name, header in schemes.items():
+            request = partial(self._request, options["url"], header)
+            queries = self._count_queries(request)
+            median, p95 = benchmarks.time_call(request, options["runs"])
+            self.stdout.write(
+                f"{name:<14} queries {queries:>2}  "
+                f"median {median:7.3f}ms  p95 {p95:7.3f}ms"
+            )
+
+        user.delete()
+
+    def _request(self, url, header):
+        """Send one authenticated request."""
+        res = self.client.get(url, HTTP_AUTHORIZATION=header)
+        if res.status_code != 200:
+            raise CommandError(f"GET {url} returned {res.status_code}")
+
+    def _count_queries(self, request):
+        """Return the queries run by a warm request."""
+        request()
+        # connection.queries is reset by every request, count the queries
+        # with a wrapper instead.
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            request()
+        return len(queries)
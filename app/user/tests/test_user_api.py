@@ -3,18 +3,35 @@ Tests for the user API.
 """
 
 
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
 
 
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework.request import Request
+
+from core.models import RevokedToken
+from user.authentication import (
+    SignedTokenAuthentication,
+    denylist,
+    issue_token,
+)
 
 
 CREATE_USER_URL = reverse("user:create")
 TOKEN_URL = reverse("user:token")
 ME_URL = reverse("user:me")
+SIGNED_TOKEN_URL = reverse("user:token-signed")
+REVOKE_URL = reverse("user:token-revoke")
+TAGS_URL = reverse("recipe:tag-list")
 
 
 def create_user(**params):
@@ -152,3 +169,148 @@ class PrivateUserApiTests(TestCase):
         )
         self.assertTrue(self.user.check_password(payload["password"]))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class SignedTokenApiTests(TestCase):
+    """Test authenticating with signed tokens."""
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@example.com", password="password123", name="Test"
+        )
+        self.client = APIClient()
+
+    def _authenticate(self):
+        """Obtain a signed token and use it for the next requests."""
+        res = self.client.post(
+            SIGNED_TOKEN_URL,
+            {"email": "test@example.com", "password": "password123"},
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {res.data['token']}"
+        )
+        return res.data
+
+    def test_create_signed_token(self):
+        """Test a signed token is issued with its expiry."""
+        data = self._authenticate()
+
+        self.assertGreater(data["expires"], timezone.now())
+
+    def test_create_signed_token_bad_credentials(self):
+        """Test no token is issued for bad credentials."""
+        res = self.client.post(
+            SIGNED_TOKEN_URL, {"email": "test@example.com", "password": "x"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn("token", res.data)
+
+    def test_signed_token_needs_no_queries(self):
+        """Test requests are authenticated without reading the database.
+
+        A cached list only looks up the user's cache version.
+        """
+        self._authenticate()
+        denylist.sync()
+        self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_profile_with_signed_token(self):
+        """Test the profile is loaded for signed tokens."""
+        self._authenticate()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"name": "Test", "email": self.user.email})
+
+    def test_tampered_token_rejected(self):
+        """Test a token with a changed payload is rejected."""
+        token = self._authenticate()["token"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer x{token}")
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_SIGNED_TOKEN_MAX_AGE=60)
+    def test_expired_token_rejected(self):
+        """Test a token is rejected after its expiry."""
+        self._authenticate()
+        later = timezone.now() + timedelta(seconds=61)
+
+        with patch("django.utils.timezone.now", return_value=later):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_token_rejected(self):
+        """Test a revoked token is rejected."""
+        self._authenticate()
+
+        res = self.client.post(REVOKE_URL)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_synced_from_database(self):
+        """Test tokens revoked by other workers are denied after a sync."""
+        token = self._authenticate()["token"]
+        denylist.sync()
+        request = Request(
+            RequestFactory().get(ME_URL, HTTP_AUTHORIZATION=f"Bearer {token}")
+        )
+        _, auth = SignedTokenAuthentication().authenticate(request)
+        RevokedToken.objects.create(
+            token_id=auth.token_id, expires_at=auth.expires
+        )
+
+        denylist.sync()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_token_rejected(self):
+        """Test the tokens of a deactivated user are denied."""
+        self._authenticate()
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_token_rejected(self):
+        """Test the tokens of a deleted user are denied by every worker."""
+        self._authenticate()
+        other = create_user(email="other@example.com", password="password123")
+        other_token = issue_token(other)[0]
+
+        self.user.delete()
+        denylist.sync()
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {other_token}")
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class BenchAuthCommandTests(TestCase):
+    """Test the bench_auth command"""
+
+    def test_bench_auth(self):
+        """Test the benchmark reports both schemes."""
+        out = StringIO()
+        call_command("bench_auth", runs=2, host="testserver", stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("db token", output)
+        self.assertIn("signed token", output)
@@ -1,8 +1,18 @@
 """ Views for the user API"""
 
-from rest_framework import generics, authentication, permissions
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, authentication, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from core.routers import ReplicaReadsMixin
+from user.authentication import (
+    SignedToken,
+    SignedTokenAuthentication,
+    issue_token,
+    revoke_token,
+)
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
@@ -19,14 +29,42 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class CreateSignedTokenView(CreateTokenView):
+    """Create an expiring signed auth token for user."""
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token, expires = issue_token(serializer.validated_data["user"])
+        return Response({"token": token, "expires": expires})
+
+
+class RevokeSignedTokenView(APIView):
+    """Revoke the signed token used to authenticate."""
+
+    authentication_classes = [SignedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(request=None, responses={204: None})
+    def post(self, request):
+        revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ManageUserView(ReplicaReadsMixin, generics.RetrieveUpdateAPIView):
     """Manage the authentiicated user."""
 
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [
+        SignedTokenAuthentication,
+        authentication.TokenAuthentication,
+    ]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """Retrieve and return authenticated user"""
-
-        return self.request.user
+        user = self.request.user
+        if isinstance(self.request.auth, SignedToken):
+            # Signed tokens only carry the user id.
+            user.refresh_from_db()
+        return user